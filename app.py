@@ -1,27 +1,71 @@
 import streamlit as st
-import json
+import altair as alt
 import pandas as pd
-from datetime import datetime, date, timedelta
+from datetime import timedelta
 import os
-import base64
-import pytz
+import hmac
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+from utils.storage import (
+    get_today_ecuador,
+    get_now_ecuador,
+    get_current_week_dates,
+    HISTORY_FILE,
+    STUDENTS_FILE,
+    data_lock,
+    data_signatures,
+    get_data_dir,
+    update_cleaning_records_after_deletion,
+    update_cleaning_records_after_edit,
+)
+from utils.queries import (
+    get_week_records,
+    build_week_summary,
+    filter_history,
+    build_history_dataframe,
+    count_student_records,
+)
+from utils.archive import (
+    archive_old_records,
+    archived_record_count,
+    archived_student_count,
+    get_hot_cutoff,
+    load_archived,
+)
+from utils.records import compact_record
+from utils.audit import (
+    append_entry,
+    archived_student_changes,
+    current_version,
+    entries_since,
+    describe_entry,
+    last_undoable,
+    load_entries,
+    save_with_archive,
+    student_record_changes,
+    undo_last,
+)
+from utils.live import apply_registrations, get_watcher
+from utils.validation import (
+    QUARANTINE_FILE,
+    load_clean_data,
+    next_student_id,
+    quarantine_report,
+    save_clean_data,
+    unregistered_records,
+)
+from utils.analytics import area_balance, compliance_gaps, get_rollup, recent_mondays, student_week_matrix
+from utils.metrics import REGISTRY, inc, cache_hit_rates, start_metrics_server
+from utils.logging_config import get_logger
+
+logger = get_logger("app")
 
 # SOLUCIÓN: Desactivar estadísticas para evitar errores de permisos
 os.environ['STREAMLIT_GATHER_USAGE_STATS'] = 'false'
 os.environ['STREAMLIT_SERVER_HEADLESS'] = 'true'
 
-# Configuración de zona horaria de Ecuador
-ECUADOR_TZ = pytz.timezone('America/Guayaquil')
-
-# FUNCIÓN PARA OBTENER LA FECHA ACTUAL EN ECUADOR
-def get_today_ecuador():
-    """Retorna la fecha actual en zona horaria de Ecuador"""
-    return datetime.now(ECUADOR_TZ).date()
-
-def get_now_ecuador():
-    """Retorna datetime actual en zona horaria de Ecuador"""
-    return datetime.now(ECUADOR_TZ)
-
 # Configuración de la página
 st.set_page_config(
     page_title="Sistema de Registro de Limpieza",
@@ -30,32 +74,31 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Exponer /metrics para Prometheus si se configuró un puerto
+if os.environ.get("LIMPIEZA_METRICS_PORT"):
+    try:
+        start_metrics_server(int(os.environ["LIMPIEZA_METRICS_PORT"]))
+    except Exception as e:
+        logger.warning("metrics_server_failed", extra={"error": str(e)})
+
 # Intentar importar reportlab silenciosamente
 try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    PDF_AVAILABLE = True
+    import reportlab
 except ImportError:
     # Intentar instalar reportlab solo si no está disponible
     try:
         import subprocess
         import sys
+        import importlib
         subprocess.check_call([sys.executable, "-m", "pip", "install", "reportlab"], 
                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        # Reintentar importación después de la instalación
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-        PDF_AVAILABLE = True
+        importlib.invalidate_caches()
     except:
-        PDF_AVAILABLE = False
+        pass
+
+from utils.weekly_report import PDF_AVAILABLE, generate_pdf_report as build_weekly_pdf
+from utils.export import EXPORT_FORMATS, XLSX_AVAILABLE
+from utils.student_report import build_student_tasks, group_by_student, write_student_zip
 
 # Estilos CSS personalizados y responsivos
 st.markdown("""
@@ -181,236 +224,176 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # FUNCIÓN MEJORADA PARA GENERAR PDF
-def generate_pdf_report(records, week_dates):
+def generate_pdf_report(records, week_dates, pdf_path=None):
     try:
-        if not PDF_AVAILABLE:
-            raise ImportError("reportlab no está disponible")
-            
-        # Crear directorio de reportes si no existe
-        os.makedirs("reportes", exist_ok=True)
-        
-        # Nombre del archivo con fecha de Ecuador
-        today_ecuador = get_today_ecuador()
-        pdf_path = f"reportes/reporte_limpieza_semana_{today_ecuador.strftime('%Y-%m-%d')}.pdf"
-        
-        # Crear el documento PDF
-        doc = SimpleDocTemplate(
-            pdf_path,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
-        
-        # Contenido del PDF
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # Título
-        from reportlab.lib.styles import ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#1f77b4')
-        )
-        title = Paragraph("REPORTE SEMANAL DE LIMPIEZA", title_style)
-        story.append(title)
-        
-        # Información de la semana
-        week_info_style = ParagraphStyle(
-            'WeekInfo',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=20,
-            alignment=TA_CENTER
-        )
-        week_info = Paragraph(
-            f"Semana del {week_dates[0].strftime('%d/%m/%Y')} al {week_dates[-1].strftime('%d/%m/%Y')}", 
-            week_info_style
-        )
-        story.append(week_info)
-        
-        story.append(Spacer(1, 20))
-        
-        # Preparar datos para la tabla
-        if records:
-            # Encabezados de la tabla
-            table_data = [['Fecha', 'Día', 'Estudiantes', 'Área', 'Hora']]
-            
-            for record in records:
-                # Limpiar caracteres problemáticos
-                estudiantes = ', '.join(record['estudiantes'])
-                # Reemplazar caracteres especiales
-                estudiantes = estudiantes.replace('•', '-').replace('–', '-').replace('—', '-')
-                
-                fecha_obj = datetime.strptime(record['fecha'], '%Y-%m-%d')
-                fecha_formateada = fecha_obj.strftime('%d/%m/%Y')
-                
-                table_data.append([
-                    fecha_formateada,
-                    record['dia_semana'],
-                    estudiantes,
-                    record['tipo_limpieza'],
-                    record['hora']
-                ])
-            
-            # Crear tabla
-            table = Table(table_data, colWidths=[70, 60, 180, 60, 50])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e86ab')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            
-            story.append(table)
-            
-            # Estadísticas
-            story.append(Spacer(1, 25))
-            
-            stats_style = ParagraphStyle(
-                'Stats',
-                parent=styles['Normal'],
-                fontSize=10,
-                spaceAfter=6,
-                leftIndent=20
-            )
-            
-            total_registros = len(records)
-            limpiezas_aula = len([r for r in records if r['tipo_limpieza'] == 'Aula'])
-            limpiezas_banos = len([r for r in records if r['tipo_limpieza'] == 'Baños'])
-            
-            stats_text = f"""
-            <b>ESTADÍSTICAS:</b><br/>
-            • Total de registros: {total_registros}<br/>
-            • Limpiezas de aula: {limpiezas_aula}<br/>
-            • Limpiezas de baños: {limpiezas_banos}<br/>
-            """
-            stats = Paragraph(stats_text, stats_style)
-            story.append(stats)
-        else:
-            # Mensaje cuando no hay registros
-            no_data_style = ParagraphStyle(
-                'NoData',
-                parent=styles['Normal'],
-                fontSize=12,
-                textColor=colors.gray,
-                alignment=TA_CENTER
-            )
-            no_data = Paragraph("No hay registros de limpieza para esta semana.", no_data_style)
-            story.append(no_data)
-        
-        # Pie de página con fecha de Ecuador
-        story.append(Spacer(1, 30))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.gray,
-            alignment=TA_CENTER
-        )
-        now_ecuador = get_now_ecuador()
-        footer = Paragraph(
-            f"Generado el {now_ecuador.strftime('%d/%m/%Y %H:%M:%S')} (Ecuador) - Sistema de Registro de Limpieza", 
-            footer_style
-        )
-        story.append(footer)
-        
-        # Generar PDF
-        doc.build(story)
-        return pdf_path
-        
+        return build_weekly_pdf(records, week_dates, pdf_path)
     except Exception as e:
         st.error(f"Error detallado al generar PDF: {str(e)}")
         return None
 
-# FUNCIONES PARA MANEJO DE DATOS
-def get_data_dir():
-    """Determina y crea el directorio de datos apropiado"""
-    # Primero intenta usar el directorio /data si existe (para Hugging Face Spaces)
-    if os.path.exists("/data") and os.access("/data", os.W_OK):
-        data_dir = "/data"
-    else:
-        # Si no, usa el directorio local data/
-        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
-    
-    # Crear el directorio si no existe
-    os.makedirs(data_dir, exist_ok=True)
-    return data_dir
+def keep_download(key, label, data, file_name, mime):
+    """Guarda en la sesión un archivo generado para ofrecer su descarga en las siguientes ejecuciones.
 
-def load_data(filename):
-    """Carga datos desde un archivo JSON"""
-    try:
-        data_dir = get_data_dir()
-        filepath = os.path.join(data_dir, filename)
-        
-        # Si el archivo no existe, crear uno vacío
-        if not os.path.exists(filepath):
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
-            return []
-        
-        # Leer el archivo existente
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            data = json.loads(content)
-            return data if isinstance(data, list) else []
-    except Exception as e:
-        print(f"Error al cargar {filename}: {str(e)}")
-        return []
+    Cuando otra sesión guarda datos esta sesión se vuelve a ejecutar; un botón
+    de descarga creado solo dentro de `st.button` desaparecería en esa ejecución.
+    Cada sesión conserva solo su último archivo, hasta que lo descarga.
+    """
+    st.session_state.download = {"key": key, "label": label, "data": data, "file_name": file_name, "mime": mime}
+
+def drop_download():
+    """Descarta el archivo de la sesión (Streamlit conserva su copia hasta terminar la descarga)"""
+    st.session_state.download = None
+
+def render_download(key):
+    """Muestra el botón de descarga del archivo guardado en la sesión, si es de este botón"""
+    download = st.session_state.download
+    if download is not None and download["key"] == key:
+        st.download_button(key=key, label=download["label"], data=download["data"],
+                           file_name=download["file_name"], mime=download["mime"], on_click=drop_download)
+
+def render_undo_section(key):
+    """Muestra los últimos cambios y el botón para deshacer la operación más reciente"""
+    with st.expander("🕒 Cambios recientes"):
+        entries = load_entries()
+        if not entries:
+            st.info("Aún no hay cambios registrados.")
+            return
+        for entry in reversed(entries[-10:]):
+            author = "esta sesión" if entry.get("sesion") == st.session_state.session_id else "otra sesión"
+            st.caption(f"{describe_entry(entry)} · {author}")
+
+        # Cada sesión solo deshace sus propias operaciones
+        entry = last_undoable(session=st.session_state.session_id)
+        if entry is not None and st.button("↩️ Deshacer mi última operación", key=key,
+                                           help=describe_entry(entry)):
+            with session_transaction():
+                undone, ok = undo_last(
+                    st.session_state.students, st.session_state.cleaning_history,
+                    session=st.session_state.session_id,
+                    save=lambda: save_session_data(st.session_state.students, st.session_state.cleaning_history),
+                )
+                st.session_state.audit_version = current_version()
+            if ok:
+                st.session_state.edit_mode = False
+                st.session_state.editing_student = None
+                st.session_state.confirm_delete = None
+                st.success(f"✅ Operación deshecha: {describe_entry(undone)}")
+                st.rerun()
+            else:
+                st.error("❌ No se pudo deshacer la operación: otra sesión ya cambió esos datos "
+                         "o no se pudieron guardar.")
+
+def rerun_idle_sessions(changed):
+    """Pide una nueva ejecución a las sesiones abiertas que no están ejecutando el script"""
+    if not changed & {"students.json", "cleaning_history.json"}:
+        return
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.app_session import AppSessionState
 
-def save_data(data, filename):
-    """Guarda datos en un archivo JSON"""
     try:
-        data_dir = get_data_dir()
-        filepath = os.path.join(data_dir, filename)
-        
-        # Crear directorio temporal para escritura segura
-        temp_path = filepath + ".tmp"
-        
-        # Guardar primero en archivo temporal
-        with open(temp_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-            f.flush()
-            os.fsync(f.fileno())
-        
-        # Renombrar el archivo temporal al nombre final
-        os.replace(temp_path, filepath)
-        
-        # Verificar que los datos se guardaron correctamente
-        with open(filepath, "r", encoding="utf-8") as f:
-            saved_data = json.load(f)
-            if len(saved_data) != len(data):
-                print(f"Error: Verificación de datos fallida para {filename}")
-                return False
-        
+        sessions = Runtime.instance()._session_mgr.list_active_sessions()
+    except (AttributeError, RuntimeError):
+        # Sin servidor de Streamlit (por ejemplo en AppTest) no hay sesiones que avisar
+        return
+    for session_info in sessions:
+        session = session_info.session
+        # Las sesiones que se están ejecutando verán el cambio al refrescar en su próxima ejecución
+        if getattr(session, "_state", None) == AppSessionState.APP_NOT_RUNNING:
+            session.request_rerun(None)
+
+@st.cache_resource
+def start_data_watcher():
+    """Inicia (una vez por proceso) el observador del directorio de datos"""
+    watcher = get_watcher()
+    watcher.add_listener(rerun_idle_sessions)
+    return watcher
+
+def sync_session_data():
+    """Recarga los archivos que cambiaron desde la última lectura o guardado de esta sesión.
+
+    Compara la firma de cada archivo en disco con la que guardó la sesión. Se
+    llama con `data_lock` tomado: así los datos y el registro de cambios que
+    escribió otra sesión están completos.
+    """
+    known = st.session_state.file_signatures
+    changed = {filename for filename, signature in data_signatures().items() if known.get(filename) != signature}
+    if not changed:
+        return
+    if HISTORY_FILE in changed:
+        # Los registros nuevos se toman del registro de cambios; otros cambios recargan el archivo
+        new_entries = entries_since(st.session_state.audit_version)
+        if not (new_entries and apply_registrations(st.session_state.cleaning_history, new_entries)):
+            st.session_state.students, st.session_state.cleaning_history = load_clean_data()
+            changed.discard(STUDENTS_FILE)
+    if STUDENTS_FILE in changed:
+        st.session_state.students, _ = load_clean_data(include_history=False)
+    # La carga pudo guardar los archivos ya validados: tomar las firmas al final
+    st.session_state.file_signatures = data_signatures()
+    st.session_state.audit_version = current_version()
+
+def refresh_session_data():
+    """Recarga solo los datos que otra sesión o proceso cambió desde la última ejecución"""
+    watcher = start_data_watcher()
+    changed = watcher.changed_since(st.session_state.data_versions)
+    # Sin firmas (un guardado falló) la sesión tiene cambios sin guardar: recargar siempre
+    if not changed and st.session_state.file_signatures:
+        return
+    st.session_state.data_versions = watcher.versions()
+    with data_lock():
+        sync_session_data()
+
+@contextmanager
+def session_transaction():
+    """Candado de los datos con la sesión al día, para leer, modificar y guardar sin pisar a otras sesiones"""
+    with data_lock():
+        sync_session_data()
+        yield
+
+def save_session_data(students=None, history=None, known_students=None):
+    """Guarda con `save_clean_data` solo si los archivos siguen como la sesión los leyó"""
+    filenames = [filename for filename, data in ((STUDENTS_FILE, students), (HISTORY_FILE, history))
+                 if data is not None]
+    expected = {filename: st.session_state.file_signatures.get(filename) for filename in filenames}
+    if save_clean_data(students, history, known_students, expected=expected):
+        signatures = data_signatures()
+        st.session_state.file_signatures.update({filename: signatures[filename] for filename in filenames})
         return True
-    except Exception as e:
-        print(f"Error al guardar {filename}: {str(e)}")
+    # Otro proceso cambió los archivos o no se pudo escribir: la próxima ejecución recarga del disco
+    st.session_state.file_signatures = {}
+    return False
+
+def record_operation(operation, change):
+    """Agrega la operación de esta sesión al registro de cambios"""
+    entry = append_entry(operation, change, session=st.session_state.session_id)
+    # Con el candado tomado, las entradas anteriores ya están en los datos de la sesión
+    st.session_state.audit_version = entry["version"]
+    return entry
+
+def save_student_operation(operation, change):
+    """Guarda estudiantes, historial y archivo de una operación; si algo falla, la revierte"""
+    entry = {"operacion": operation, "cambio": change}
+    if not save_with_archive(entry, st.session_state.students, st.session_state.cleaning_history,
+                             lambda: save_session_data(st.session_state.students, st.session_state.cleaning_history)):
         return False
+    record_operation(operation, change)
+    return True
 
 def initialize_session_state():
     """Inicializa el estado de la sesión y asegura la persistencia de datos"""
     # Inicializar datos principales
     if 'initialized' not in st.session_state:
+        inc("limpieza_cache_requests_total", cache="sesion", resultado="miss")
         # Primera carga - intentar cargar datos existentes
-        students_data = load_data("students.json")
-        cleaning_data = load_data("cleaning_history.json")
+        st.session_state.data_versions = start_data_watcher().versions()
+        with data_lock():
+            st.session_state.audit_version = current_version()
+            # Datos validados: lo inválido queda en cuarentena y no llega a las páginas
+            students_data, cleaning_data = load_clean_data()
+            st.session_state.file_signatures = data_signatures()
+            # Mover al archivo mensual los registros antiguos
+            cleaning_data, archived = archive_old_records(cleaning_data)
+            if archived:
+                save_session_data(students_data, cleaning_data)
         
         # Configurar el estado inicial
         st.session_state.students = students_data
@@ -418,52 +401,33 @@ def initialize_session_state():
         st.session_state.editing_student = None
         st.session_state.edit_mode = False
         st.session_state.confirm_delete = None
+        st.session_state.is_admin = False
+        st.session_state.session_id = uuid.uuid4().hex
+        st.session_state.download = None
         st.session_state.initialized = True
-        
-        # Guardar datos iniciales para asegurar que los archivos existan
-        save_data(students_data, "students.json")
-        save_data(cleaning_data, "cleaning_history.json")
     else:
+        inc("limpieza_cache_requests_total", cache="sesion", resultado="hit")
+        if 'file_signatures' not in st.session_state:
+            st.session_state.file_signatures = {}
+        if 'data_versions' in st.session_state:
+            refresh_session_data()
         # En recargas posteriores, verificar la integridad de los datos
         if 'students' not in st.session_state:
-            st.session_state.students = load_data("students.json")
+            st.session_state.students, _ = load_clean_data(include_history=False)
         if 'cleaning_history' not in st.session_state:
-            st.session_state.cleaning_history = load_data("cleaning_history.json")
+            _, st.session_state.cleaning_history = load_clean_data()
         if 'editing_student' not in st.session_state:
             st.session_state.editing_student = None
         if 'edit_mode' not in st.session_state:
             st.session_state.edit_mode = False
         if 'confirm_delete' not in st.session_state:
             st.session_state.confirm_delete = None
-
-def get_current_week_dates():
-    """Obtiene las fechas de la semana actual en zona horaria de Ecuador"""
-    today = get_today_ecuador()
-    start_of_week = today - timedelta(days=today.weekday())
-    return [start_of_week + timedelta(days=i) for i in range(5)]
-
-# FUNCIÓN PARA ACTUALIZAR REGISTROS DE LIMPIEZA CUANDO SE ELIMINA UN ESTUDIANTE
-def update_cleaning_records_after_deletion(student_name):
-    """Elimina al estudiante de todos los registros de limpieza donde aparece"""
-    updated_records = []
-    for record in st.session_state.cleaning_history:
-        # Filtrar el estudiante eliminado de la lista de estudiantes
-        updated_students = [s for s in record['estudiantes'] if s != student_name]
-        
-        # Solo mantener el registro si todavía tiene estudiantes
-        if updated_students:
-            record['estudiantes'] = updated_students
-            updated_records.append(record)
-    
-    return updated_records
-
-# FUNCIÓN PARA ACTUALIZAR REGISTROS DE LIMPIEZA CUANDO SE EDITA UN ESTUDIANTE
-def update_cleaning_records_after_edit(old_name, new_name):
-    """Actualiza el nombre del estudiante en todos los registros de limpieza"""
-    for record in st.session_state.cleaning_history:
-        if old_name in record['estudiantes']:
-            # Reemplazar el nombre antiguo por el nuevo
-            record['estudiantes'] = [new_name if s == old_name else s for s in record['estudiantes']]
+        if 'is_admin' not in st.session_state:
+            st.session_state.is_admin = False
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+        if 'download' not in st.session_state:
+            st.session_state.download = None
 
 initialize_session_state()
 
@@ -484,6 +448,7 @@ if os.access(data_dir, os.W_OK):
     📁 Directorio de datos: {data_dir}
     📊 Estudiantes registrados: {len(st.session_state.students)}
     📝 Registros de limpieza: {len(st.session_state.cleaning_history)}
+    🗄️ Registros archivados: {archived_record_count()}
     """
     
     # Verificar si podemos escribir en los archivos
@@ -501,12 +466,29 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
     
+    pages = ["🏠 Inicio", "👥 Estudiantes", "📝 Limpieza", "📊 Reportes", "📈 Analítica"]
+    if st.session_state.is_admin:
+        pages.append("⚙️ Rendimiento")
     page = st.radio(
         "**Navegación**", 
-        ["🏠 Inicio", "👥 Estudiantes", "📝 Limpieza", "📊 Reportes"],
+        pages,
         key="navigation"
     )
 
+    # Acceso de administrador (solo si se configuró LIMPIEZA_ADMIN_PASSWORD)
+    admin_password = os.environ.get("LIMPIEZA_ADMIN_PASSWORD")
+    if admin_password and not st.session_state.is_admin:
+        with st.expander("🔐 Administrador"):
+            password = st.text_input("Contraseña:", type="password", key="admin_password")
+            if st.button("Ingresar", key="admin_login"):
+                if hmac.compare_digest(password.encode("utf-8"), admin_password.encode("utf-8")):
+                    st.session_state.is_admin = True
+                    st.rerun()
+                else:
+                    st.error("❌ Contraseña incorrecta.")
+
+inc("limpieza_reruns_total", pagina=page)
+
 # Página de Inicio
 if page == "🏠 Inicio":
     st.markdown('<h2 class="section-header">Dashboard Principal</h2>', unsafe_allow_html=True)
@@ -518,43 +500,22 @@ if page == "🏠 Inicio":
         st.metric("Total Estudiantes", len(st.session_state.students))
     
     with col2:
-        st.metric("Registros Totales", len(st.session_state.cleaning_history))
+        st.metric("Registros Totales", len(st.session_state.cleaning_history) + archived_record_count())
     
+    week_dates = get_current_week_dates()
     with col3:
-        week_records = []
-        try:
-            week_dates = get_current_week_dates()
-            week_records = [r for r in st.session_state.cleaning_history 
-                           if datetime.strptime(r['fecha'], '%Y-%m-%d').date() in week_dates]
-        except:
-            week_records = []
+        week_records = get_week_records(st.session_state.cleaning_history, week_dates)
         st.metric("Limpiezas Esta Semana", len(week_records))
     
     # Resumen de limpiezas de la semana actual
     st.markdown('<h2 class="section-header">Resumen Semanal</h2>', unsafe_allow_html=True)
     
-    try:
-        week_dates = get_current_week_dates()
-        week_summary = []
-        for day_date in week_dates:
-            day_name = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"][day_date.weekday()]
-            day_records = [r for r in st.session_state.cleaning_history 
-                          if datetime.strptime(r['fecha'], '%Y-%m-%d').date() == day_date]
-            for record in day_records:
-                week_summary.append({
-                    'Día': day_name,
-                    'Fecha': day_date.strftime('%d/%m/%Y'),
-                    'Estudiantes': ', '.join(record['estudiantes']),
-                    'Área': record['tipo_limpieza'],
-                    'Hora': record['hora']
-                })
-        if week_summary:
-            df_week = pd.DataFrame(week_summary)
-            st.dataframe(df_week, use_container_width=True)
-        else:
-            st.info("No hay registros de limpieza para esta semana.")
-    except Exception as e:
-        st.error(f"Error al cargar el resumen semanal: {e}")
+    week_summary = build_week_summary(st.session_state.cleaning_history, week_dates)
+    if week_summary:
+        df_week = pd.DataFrame(week_summary)
+        st.dataframe(df_week, use_container_width=True)
+    else:
+        st.info("No hay registros de limpieza para esta semana.")
 
 # Página de Estudiantes
 elif page == "👥 Estudiantes":
@@ -605,50 +566,70 @@ elif page == "👥 Estudiantes":
                 student_name = student_name.strip().upper()
                 
                 if st.session_state.edit_mode:
-                    # MODO EDICIÓN
-                    old_name = st.session_state.editing_student['nombre']
-                    old_id = st.session_state.editing_student['id']
-                    
-                    # Verificar si el nuevo nombre ya existe (excluyendo el actual)
-                    existing_names = [s['nombre'].upper() for s in st.session_state.students if s['nombre'] != old_name]
-                    if student_name.upper() in existing_names:
-                        st.error("❌ Ya existe otro estudiante con ese nombre.")
-                    else:
-                        # Actualizar el estudiante
-                        now_ecuador = get_now_ecuador()
-                        for student in st.session_state.students:
-                            if student['nombre'] == old_name:
-                                student['nombre'] = student_name
-                                student['id'] = student_id.strip() if student_id else old_id
-                                student['fecha_actualizacion'] = now_ecuador.strftime('%Y-%m-%d %H:%M:%S')
-                                break
-                        
-                        # Actualizar registros de limpieza
-                        update_cleaning_records_after_edit(old_name, student_name)
-                        
-                        if save_data(st.session_state.students, "students.json") and save_data(st.session_state.cleaning_history, "cleaning_history.json"):
-                            st.success("✅ Estudiante actualizado exitosamente!")
+                    # MODO EDICIÓN (sobre los datos más recientes)
+                    with session_transaction():
+                        old_name = st.session_state.editing_student['nombre']
+                        old_id = st.session_state.editing_student['id']
+
+                        # Verificar si el nuevo nombre ya existe (excluyendo el actual)
+                        existing_names = [s['nombre'].upper() for s in st.session_state.students if s['nombre'] != old_name]
+                        existing_ids = {s['id'] for s in st.session_state.students if s['nombre'] != old_name}
+                        if not any(s['nombre'] == old_name for s in st.session_state.students):
+                            st.error("❌ Otra sesión eliminó o renombró a este estudiante.")
                             st.session_state.edit_mode = False
                             st.session_state.editing_student = None
+                        elif student_name.upper() in existing_names:
+                            st.error("❌ Ya existe otro estudiante con ese nombre.")
+                        elif student_id.strip() in existing_ids:
+                            st.error("❌ Ya existe otro estudiante con ese ID.")
                         else:
-                            st.error("❌ Error al guardar los cambios.")
+                            # Actualizar el estudiante
+                            now_ecuador = get_now_ecuador()
+                            change = {
+                                "registros": student_record_changes(st.session_state.cleaning_history, old_name),
+                                "archivo": archived_student_changes(old_name),
+                            }
+                            for position, student in enumerate(st.session_state.students):
+                                if student['nombre'] == old_name:
+                                    change.update(pos=position, antes=dict(student))
+                                    student['nombre'] = student_name
+                                    student['id'] = student_id.strip() if student_id else old_id
+                                    student['fecha_actualizacion'] = now_ecuador.strftime('%Y-%m-%d %H:%M:%S')
+                                    change['despues'] = dict(student)
+                                    break
+
+                            # Actualizar registros de limpieza
+                            update_cleaning_records_after_edit(st.session_state.cleaning_history, old_name, student_name)
+
+                            if save_student_operation("editar_estudiante", change):
+                                st.success("✅ Estudiante actualizado exitosamente!")
+                                st.session_state.edit_mode = False
+                                st.session_state.editing_student = None
+                            else:
+                                st.error("❌ Error al guardar los cambios.")
                 else:
-                    # MODO AGREGAR
-                    existing_students = [s['nombre'].upper() for s in st.session_state.students]
-                    if student_name.upper() in existing_students:
-                        st.error("❌ Este estudiante ya está registrado.")
-                    else:
-                        now_ecuador = get_now_ecuador()
-                        new_student = {
-                            'id': student_id.strip() if student_id else f"ST{len(st.session_state.students) + 1:03d}",
-                            'nombre': student_name,
-                            'fecha_registro': now_ecuador.strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                        st.session_state.students.append(new_student)
-                        if save_data(st.session_state.students, "students.json"):
-                            st.success("✅ Estudiante registrado exitosamente!")
+                    # MODO AGREGAR (sobre los datos más recientes)
+                    with session_transaction():
+                        existing_students = [s['nombre'].upper() for s in st.session_state.students]
+                        if student_name.upper() in existing_students:
+                            st.error("❌ Este estudiante ya está registrado.")
+                        elif student_id.strip() in {s['id'] for s in st.session_state.students}:
+                            st.error("❌ Ya existe un estudiante con ese ID.")
                         else:
-                            st.error("❌ Error al guardar el estudiante.")
+                            now_ecuador = get_now_ecuador()
+                            new_student = {
+                                'id': student_id.strip() if student_id.strip() else next_student_id(st.session_state.students),
+                                'nombre': student_name,
+                                'fecha_registro': now_ecuador.strftime('%Y-%m-%d %H:%M:%S')
+                            }
+                            st.session_state.students.append(new_student)
+                            if save_session_data(st.session_state.students):
+                                record_operation("agregar_estudiante", {
+                                    "estudiante": new_student, "pos": len(st.session_state.students) - 1
+                                })
+                                st.success("✅ Estudiante registrado exitosamente!")
+                            else:
+                                st.error("❌ Error al guardar el estudiante.")
             else:
                 st.error("❌ Por favor ingresa un nombre válido.")
     
@@ -691,8 +672,8 @@ elif page == "👥 Estudiantes":
             # Contar en cuántos registros de limpieza aparece
             cleaning_count = 0
             if student_to_delete:
-                cleaning_count = sum(1 for record in st.session_state.cleaning_history 
-                                   if student_to_delete in record['estudiantes'])
+                cleaning_count = count_student_records(st.session_state.cleaning_history, student_to_delete) + \
+                                 archived_student_count(student_to_delete)
                 
                 if cleaning_count > 0:
                     st.warning(f"⚠️ Este estudiante aparece en {cleaning_count} registro(s) de limpieza.")
@@ -708,24 +689,39 @@ elif page == "👥 Estudiantes":
                 col_a, col_b = st.columns(2)
                 with col_a:
                     if st.button("✅ Sí, eliminar", key="confirm_yes", type="primary"):
-                        # Eliminar estudiante de la lista
-                        st.session_state.students = [s for s in st.session_state.students 
-                                                   if s['nombre'] != student_to_delete]
-                        
-                        # Actualizar registros de limpieza
-                        st.session_state.cleaning_history = update_cleaning_records_after_deletion(student_to_delete)
-                        
-                        # Guardar cambios
-                        if save_data(st.session_state.students, "students.json") and \
-                           save_data(st.session_state.cleaning_history, "cleaning_history.json"):
-                            st.session_state.confirm_delete = None
-                            st.success(f"✅ Estudiante '{student_to_delete}' eliminado exitosamente!")
-                            if cleaning_count > 0:
-                                st.success(f"✅ Removido de {cleaning_count} registro(s) de limpieza.")
-                            st.rerun()
-                        else:
-                            st.error("❌ Error al eliminar el estudiante.")
-                            st.session_state.confirm_delete = None
+                        with session_transaction():
+                            # Guardar en el registro de cambios lo necesario para deshacer
+                            position = next((i for i, s in enumerate(st.session_state.students)
+                                             if s['nombre'] == student_to_delete), None)
+                            if position is None:
+                                st.session_state.confirm_delete = None
+                                st.error("❌ Otra sesión ya eliminó o renombró a este estudiante.")
+                            else:
+                                change = {
+                                    "estudiante": dict(st.session_state.students[position]),
+                                    "pos": position,
+                                    "registros": student_record_changes(st.session_state.cleaning_history,
+                                                                        student_to_delete, deletion=True),
+                                    "archivo": archived_student_changes(student_to_delete, deletion=True),
+                                }
+
+                                # Eliminar estudiante de la lista
+                                st.session_state.students = [s for s in st.session_state.students 
+                                                           if s['nombre'] != student_to_delete]
+
+                                # Actualizar registros de limpieza
+                                st.session_state.cleaning_history = update_cleaning_records_after_deletion(st.session_state.cleaning_history, student_to_delete)
+
+                                # Guardar cambios
+                                if save_student_operation("eliminar_estudiante", change):
+                                    st.session_state.confirm_delete = None
+                                    st.success(f"✅ Estudiante '{student_to_delete}' eliminado exitosamente!")
+                                    if cleaning_count > 0:
+                                        st.success(f"✅ Removido de {cleaning_count} registro(s) de limpieza.")
+                                    st.rerun()
+                                else:
+                                    st.error("❌ Error al eliminar el estudiante.")
+                                    st.session_state.confirm_delete = None
                 
                 with col_b:
                     if st.button("❌ Cancelar", key="confirm_no"):
@@ -740,6 +736,8 @@ elif page == "👥 Estudiantes":
     else:
         st.info("No hay estudiantes registrados aún.")
 
+    render_undo_section("undo_students")
+
 # Página de Limpieza
 elif page == "📝 Limpieza":
     st.markdown('<h2 class="section-header">Registro de Limpieza Diaria</h2>', unsafe_allow_html=True)
@@ -769,25 +767,33 @@ elif page == "📝 Limpieza":
             if not students_selected:
                 st.error("❌ Debes seleccionar al menos un estudiante.")
             else:
-                all_registered = all(student in available_students for student in students_selected)
-                if not all_registered:
-                    st.error("❌ Uno o más estudiantes no están registrados. Por favor regístralos primero.")
-                else:
-                    now_ecuador = get_now_ecuador()
-                    new_record = {
-                        'fecha': cleaning_date.strftime('%Y-%m-%d'),
-                        'dia_semana': ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"][cleaning_date.weekday()],
-                        'hora': now_ecuador.strftime('%H:%M:%S'),
-                        'estudiantes': students_selected,
-                        'tipo_limpieza': cleaning_type,
-                        'timestamp': now_ecuador.strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    st.session_state.cleaning_history.append(new_record)
-                    if save_data(st.session_state.cleaning_history, "cleaning_history.json"):
-                        st.success("✅ Limpieza registrada exitosamente!")
-                        st.balloons()
+                # Validar y guardar sobre los datos más recientes (otra sesión pudo cambiarlos)
+                with session_transaction():
+                    registered = {s['nombre'] for s in st.session_state.students}
+                    if not all(student in registered for student in students_selected):
+                        st.error("❌ Uno o más estudiantes no están registrados. Por favor regístralos primero.")
                     else:
-                        st.error("❌ Error al guardar el registro de limpieza.")
+                        now_ecuador = get_now_ecuador()
+                        new_record = {
+                            'fecha': cleaning_date.strftime('%Y-%m-%d'),
+                            'dia_semana': ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"][cleaning_date.weekday()],
+                            'hora': now_ecuador.strftime('%H:%M:%S'),
+                            'estudiantes': students_selected,
+                            'tipo_limpieza': cleaning_type,
+                            'timestamp': now_ecuador.strftime('%Y-%m-%d %H:%M:%S')
+                        }
+                        st.session_state.cleaning_history.append(compact_record(new_record))
+                        if save_session_data(history=st.session_state.cleaning_history,
+                                             known_students=st.session_state.students):
+                            record_operation("registrar_limpieza", {
+                                "registro": new_record, "pos": len(st.session_state.cleaning_history) - 1
+                            })
+                            st.success("✅ Limpieza registrada exitosamente!")
+                            st.balloons()
+                        else:
+                            st.error("❌ Error al guardar el registro de limpieza.")
+
+    render_undo_section("undo_cleaning")
 
 # Página de Reportes
 elif page == "📊 Reportes":
@@ -812,22 +818,17 @@ elif page == "📊 Reportes":
         else:
             start_date = end_date = date_range
 
-    filtered_history = st.session_state.cleaning_history.copy()
-    if filter_type != "Todos":
-        filtered_history = [r for r in filtered_history if r['tipo_limpieza'] == filter_type]
-    try:
-        if isinstance(date_range, tuple) and len(date_range) == 2:
-            filtered_history = [
-                r for r in filtered_history 
-                if start_date <= datetime.strptime(r['fecha'], '%Y-%m-%d').date() <= end_date
-            ]
-    except:
-        pass
+    source_history = st.session_state.cleaning_history
+    # Los meses archivados solo se leen si el rango los incluye
+    if isinstance(date_range, tuple) and len(date_range) == 2 and start_date < get_hot_cutoff():
+        source_history = load_archived(start_date, end_date) + source_history
+
+    filtered_history = filter_history(source_history, filter_type)
+    if isinstance(date_range, tuple) and len(date_range) == 2:
+        filtered_history = filter_history(filtered_history, "Todos", start_date, end_date)
 
     if filtered_history:
-        history_df = pd.DataFrame(filtered_history)
-        history_df['Fecha'] = pd.to_datetime(history_df['fecha']).dt.strftime('%d/%m/%Y')
-        display_df = history_df[['Fecha', 'dia_semana', 'hora', 'estudiantes', 'tipo_limpieza']]
+        display_df = build_history_dataframe(filtered_history)
         st.dataframe(display_df, use_container_width=True)
 
         st.subheader("Estadísticas")
@@ -836,6 +837,27 @@ elif page == "📊 Reportes":
         col2.metric("Limpiezas de Aula", len([r for r in filtered_history if r['tipo_limpieza'] == 'Aula']))
         col3.metric("Limpiezas de Baños", len([r for r in filtered_history if r['tipo_limpieza'] == 'Baños']))
 
+        st.subheader("Exportar Historial")
+        formats = list(EXPORT_FORMATS) if XLSX_AVAILABLE else ["CSV"]
+        col1, col2 = st.columns(2)
+        with col1:
+            export_format = st.radio("Formato:", formats, horizontal=True, key="export_format")
+        with col2:
+            if st.button("📤 Exportar registros filtrados", key="export_button"):
+                write_export, extension, mime = EXPORT_FORMATS[export_format]
+                export_name = f"historial_limpieza_{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}.{extension}"
+                try:
+                    # Archivo temporal propio de esta exportación: se borra al cerrarlo
+                    with st.spinner("Exportando..."), tempfile.TemporaryFile() as export_file:
+                        exported = write_export(export_file, filtered_history)
+                        export_file.seek(0)
+                        export_data = export_file.read()
+                    keep_download("download_export", f"⬇️ Descargar {export_format} ({exported} registros)",
+                                  export_data, export_name, mime)
+                except Exception as e:
+                    st.error(f"❌ Error al exportar el historial: {str(e)}")
+            render_download("download_export")
+
         st.subheader("Generar Reporte PDF")
         
         if not PDF_AVAILABLE:
@@ -844,38 +866,193 @@ elif page == "📊 Reportes":
             if st.button("📥 Descargar Reporte Semanal"):
                 try:
                     week_dates = get_current_week_dates()
-                    week_records = [r for r in st.session_state.cleaning_history 
-                                  if datetime.strptime(r['fecha'], '%Y-%m-%d').date() in week_dates]
+                    week_records = get_week_records(st.session_state.cleaning_history, week_dates)
                     
                     if week_records:
-                        with st.spinner("Generando PDF..."):
-                            pdf_path = generate_pdf_report(week_records, week_dates)
+                        # Directorio temporal propio: otras sesiones pueden generar el mismo reporte
+                        with st.spinner("Generando PDF..."), tempfile.TemporaryDirectory() as temp_dir:
+                            pdf_path = generate_pdf_report(week_records, week_dates,
+                                                           os.path.join(temp_dir, "reporte_semanal.pdf"))
+                            pdf_data = None
+                            if pdf_path and os.path.exists(pdf_path):
+                                with open(pdf_path, "rb") as pdf_file:
+                                    pdf_data = pdf_file.read()
                         
-                        if pdf_path and os.path.exists(pdf_path):
-                            with open(pdf_path, "rb") as pdf_file:
-                                pdf_data = pdf_file.read()
-                            
+                        if pdf_data is not None:
                             st.success("✅ PDF generado exitosamente!")
                             
                             # Botón de descarga
                             today_ecuador = get_today_ecuador()
-                            st.download_button(
-                                label="📄 Descargar PDF",
-                                data=pdf_data,
-                                file_name=f"reporte_limpieza_semana_{today_ecuador.strftime('%Y-%m-%d')}.pdf",
-                                mime="application/pdf",
-                                key="download_pdf"
-                            )
+                            keep_download("download_pdf", "📄 Descargar PDF", pdf_data,
+                                          f"reporte_limpieza_semana_{today_ecuador.strftime('%Y-%m-%d')}.pdf",
+                                          "application/pdf")
                         else:
                             st.error("❌ No se pudo generar el archivo PDF.")
                     else:
                         st.warning("No hay registros de limpieza para esta semana.")
                 except Exception as e:
                     st.error(f"❌ Error al generar el PDF: {str(e)}")
+            render_download("download_pdf")
+
+            st.subheader("Resúmenes por Estudiante")
+            st.caption("Un PDF por estudiante con los registros filtrados arriba, en un solo archivo ZIP.")
+            include_empty = st.checkbox("Incluir estudiantes sin registros", value=True, key="include_empty")
+            if st.button("📦 Generar Resúmenes por Estudiante", key="student_reports"):
+                grouped = group_by_student(filtered_history, [s['nombre'] for s in st.session_state.students])
+                tasks = build_student_tasks(grouped, start_date, end_date, skip_empty=not include_empty)
+                progress_bar = st.progress(0.0, text="Generando resúmenes...")
+
+                def update_progress(done, total, student_name):
+                    progress_bar.progress(done / total, text=f"{done}/{total} · {student_name}")
+
+                zip_name = f"resumenes_estudiantes_{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}.zip"
+                with tempfile.TemporaryFile() as zip_file:
+                    failures = write_student_zip(zip_file, tasks, progress=update_progress)
+                    zip_file.seek(0)
+                    zip_data = zip_file.read()
+                if failures:
+                    st.error(f"❌ No se pudieron generar {len(failures)} resumen(es): "
+                             + ", ".join(name for name, _ in failures))
+                st.success(f"✅ {len(tasks) - len(failures)} resumen(es) generado(s).")
+                keep_download("download_zip", "📦 Descargar ZIP", zip_data, zip_name, "application/zip")
+            render_download("download_zip")
 
     else:
         st.info("No hay registros de limpieza que coincidan con los filtros seleccionados.")
 
+# Página de Analítica
+elif page == "📈 Analítica":
+    st.markdown('<h2 class="section-header">Analítica</h2>', unsafe_allow_html=True)
+
+    rollup = get_rollup()
+    student_names = [s['nombre'] for s in st.session_state.students]
+    weeks = st.slider("Semanas a mostrar:", min_value=4, max_value=26, value=8, key="analytics_weeks")
+    mondays = recent_mondays(weeks)
+
+    # Mapa de calor estudiante × semana
+    st.subheader("Limpiezas por Estudiante y Semana")
+    if student_names:
+        heatmap_df = student_week_matrix(rollup, mondays, student_names)
+        heatmap = alt.Chart(heatmap_df).mark_rect().encode(
+            x=alt.X('Semana:O', sort=[m.strftime('%d/%m/%Y') for m in mondays], title="Semana (lunes)"),
+            y=alt.Y('Estudiante:N', sort=student_names),
+            color=alt.Color('Limpiezas:Q', scale=alt.Scale(scheme='blues')),
+            tooltip=['Estudiante', 'Semana', 'Limpiezas']
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+    else:
+        st.info("No hay estudiantes registrados aún.")
+
+    # Balance de carga por área
+    st.subheader("Carga por Área (todo el historial)")
+    balance_df = area_balance(rollup, student_names)
+    if not balance_df.empty:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Promedio por Estudiante", f"{balance_df['Total'].mean():.1f}")
+        col2.metric("Máximo", int(balance_df['Total'].max()))
+        col3.metric("Mínimo", int(balance_df['Total'].min()))
+        balance_chart = alt.Chart(
+            balance_df.melt(id_vars='Estudiante', value_vars=['Aula', 'Baños'], var_name='Área', value_name='Limpiezas')
+        ).mark_bar().encode(
+            x=alt.X('Limpiezas:Q', stack='zero'),
+            y=alt.Y('Estudiante:N', sort=list(balance_df['Estudiante'])),
+            color='Área:N',
+            tooltip=['Estudiante', 'Área', 'Limpiezas']
+        )
+        st.altair_chart(balance_chart, use_container_width=True)
+        st.dataframe(balance_df, use_container_width=True)
+
+    # Días hábiles sin registro de Aula o Baños
+    st.subheader("Días sin Registro")
+    gaps_df = compliance_gaps(rollup, mondays[0], get_today_ecuador())
+    if gaps_df.empty:
+        st.success("✅ Todos los días hábiles del período tienen registro de Aula y Baños.")
+    else:
+        st.warning(f"⚠️ {len(gaps_df)} día(s) hábil(es) sin registro completo en las últimas {weeks} semanas.")
+        st.dataframe(gaps_df, use_container_width=True)
+
+# Página de Rendimiento (solo administradores)
+elif page == "⚙️ Rendimiento" and st.session_state.is_admin:
+    st.markdown('<h2 class="section-header">Rendimiento</h2>', unsafe_allow_html=True)
+
+    summaries = REGISTRY.summaries()
+    counters = REGISTRY.counters()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Reruns", sum(v for name, _, v in counters if name == "limpieza_reruns_total"))
+    col2.metric("Errores", sum(v for name, _, v in counters if name == "limpieza_errors_total"))
+    save_bytes = [s for s in summaries if s[0] == "limpieza_save_bytes"]
+    saves = sum(s[2] for s in save_bytes)
+    col3.metric("Bytes por guardado (promedio)", f"{sum(s[3] for s in save_bytes) / saves:,.0f}" if saves else "0")
+
+    st.subheader("Latencias")
+    latency_rows = [
+        {
+            'Métrica': name,
+            'Etiquetas': ', '.join(f"{k}={v}" for k, v in labels.items()),
+            'Llamadas': count,
+            'p50 (ms)': round(p50 * 1000, 2),
+            'p95 (ms)': round(p95 * 1000, 2),
+        }
+        for name, labels, count, total, p50, p95 in summaries if name.endswith("_seconds")
+    ]
+    if latency_rows:
+        st.dataframe(pd.DataFrame(latency_rows), use_container_width=True)
+    else:
+        st.info("Aún no hay mediciones.")
+
+    st.subheader("Bytes escritos por guardado")
+    if save_bytes:
+        st.dataframe(pd.DataFrame([
+            {
+                'Archivo': labels.get('archivo'),
+                'Guardados': count,
+                'Total': int(total),
+                'p50': int(p50),
+                'p95': int(p95),
+            }
+            for name, labels, count, total, p50, p95 in save_bytes
+        ]), use_container_width=True)
+    else:
+        st.info("Aún no se ha guardado ningún archivo.")
+
+    st.subheader("Reruns y cachés")
+    col1, col2 = st.columns(2)
+    with col1:
+        rerun_rows = [{'Página': labels.get('pagina'), 'Reruns': value}
+                      for name, labels, value in counters if name == "limpieza_reruns_total"]
+        st.dataframe(pd.DataFrame(rerun_rows), use_container_width=True)
+    with col2:
+        cache_rows = [{'Caché': cache, 'Aciertos': hits, 'Fallos': misses, 'Tasa de aciertos': f"{rate:.1%}"}
+                      for cache, (hits, misses, rate) in cache_hit_rates().items()]
+        st.dataframe(pd.DataFrame(cache_rows), use_container_width=True)
+
+    st.subheader("Cuarentena")
+    quarantined = quarantine_report()
+    if quarantined:
+        st.warning(f"⚠️ Hay registros inválidos que se movieron a {QUARANTINE_FILE} al cargar o guardar.")
+        st.dataframe(pd.DataFrame([
+            {'Archivo': filename, 'Motivo': reason, 'Registros': count}
+            for (filename, reason), count in quarantined.most_common()
+        ]), use_container_width=True)
+    else:
+        st.info("No hay registros en cuarentena.")
+    unregistered = unregistered_records(st.session_state.cleaning_history, st.session_state.students)
+    if unregistered:
+        st.warning(f"⚠️ {len(unregistered)} registro(s) del historial mencionan estudiantes no registrados; "
+                   "se conservan sin cambios.")
+
+    with st.expander("Métricas en formato Prometheus"):
+        prometheus_text = REGISTRY.render_prometheus()
+        st.code(prometheus_text, language="text")
+        st.download_button(
+            label="📥 Descargar métricas",
+            data=prometheus_text,
+            file_name="metrics.prom",
+            mime="text/plain",
+            key="download_metrics"
+        )
+
 # Footer
 st.markdown("---")
 now_ecuador = get_now_ecuador()
@@ -0,0 +1,278 @@
+"""Prueba de carga de app.py con sesiones concurrentes simuladas.
+
+Cada sesión es un `AppTest` de Streamlit que corre en su propio hilo contra
+un directorio de datos temporal: registra su propio estudiante con
+`student_form`, navega entre Inicio, Estudiantes, Limpieza y Reportes y
+registra limpiezas con `cleaning_form`. Al final se reporta la latencia de
+cada tipo de interacción (p50/p95/p99/máximo) y se verifican los archivos
+guardados: JSON válido, sin temporales pendientes, y que cada estudiante y
+cada limpieza confirmados en pantalla estén en disco (escrituras perdidas).
+
+    python -m benchmarks.load --sesiones 50 --acciones 20
+    python -m benchmarks.load --sesiones 10 --registros 100000 --json carga.json
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PAGES = ["🏠 Inicio", "👥 Estudiantes", "📝 Limpieza", "📊 Reportes"]
+
+def install_shared_runtime():
+    """Adapta `AppTest` para ejecutar varias sesiones en paralelo.
+
+    `AppTest` reemplaza `Runtime._instance` al inicio de cada ejecución y lo
+    borra al terminar, lo que rompe a las demás sesiones si corren en
+    paralelo. Se le entrega una clase propia para esa asignación y el
+    Runtime simulado real se instala una sola vez. Como en el servidor, el
+    bytecode de app.py se comparte (compilar en paralelo falla en Python
+    3.11), y se espera a que el hilo del script emita su evento de cierre
+    antes de que `AppTest` lo lea.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    class _PerRunRuntime:
+        _instance = None
+
+    app_test.Runtime = _PerRunRuntime
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+    run = LocalScriptRunner.run
+
+    def run_and_join(self, *args, **kwargs):
+        tree = run(self, *args, **kwargs)
+        self.join()
+        return tree
+
+    LocalScriptRunner.run = run_and_join
+
+class SessionResult:
+    def __init__(self, index):
+        self.index = index
+        self.student_name = f"CARGA {index:03d}"
+        self.latencies = []          # (acción, segundos)
+        self.errors = []
+        self.student_added = False
+        self.cleanings = 0           # limpiezas confirmadas en pantalla
+
+def _find_button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+def _succeeded(at):
+    return any("exitosamente" in str(s.value) for s in at.success)
+
+def run_session(index, actions, seed, timeout, start_barrier):
+    """Simula a un docente: agrega su estudiante, navega y registra limpiezas"""
+    from streamlit.testing.v1 import AppTest
+
+    result = SessionResult(index)
+    rng = random.Random(seed + index)
+
+    def step(action, at, prepare=None):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        at.run(timeout=timeout)
+        result.latencies.append((action, time.perf_counter() - start))
+        if at.exception:
+            result.errors.append(f"{action}: {at.exception[0].message}")
+            return False
+        return True
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    start_barrier.wait()
+    if not step("inicio_sesion", at):
+        return result
+
+    # Registrar el estudiante propio de la sesión
+    def navigate(page):
+        at.sidebar.radio[0].set_value(page)
+
+    if step("navegar", at, lambda: navigate("👥 Estudiantes")):
+        def fill_student():
+            at.text_input(key="student_name").set_value(result.student_name)
+            _find_button(at, "👤 Agregar Estudiante").click()
+        if step("student_form", at, fill_student):
+            result.student_added = _succeeded(at)
+
+    def register_cleaning():
+        if at.sidebar.radio[0].value != "📝 Limpieza" and not step("navegar", at, lambda: navigate("📝 Limpieza")):
+            return
+        if result.student_name not in at.selectbox(key="student1").options:
+            result.errors.append("cleaning_form: el estudiante propio no aparece en la lista")
+            return
+
+        def fill_cleaning():
+            at.selectbox(key="student1").set_value(result.student_name)
+            at.selectbox(key="cleaning_type").set_value(rng.choice(["Aula", "Baños"]))
+            _find_button(at, "Registrar Limpieza").click()
+        if step("cleaning_form", at, fill_cleaning) and _succeeded(at):
+            result.cleanings += 1
+
+    for _ in range(actions):
+        try:
+            if rng.random() < 0.5:
+                step("navegar", at, lambda: navigate(rng.choice(PAGES)))
+            else:
+                register_cleaning()
+        except (IndexError, KeyError, StopIteration) as e:
+            # La página no tiene el elemento esperado (por ejemplo tras una ejecución fallida)
+            result.errors.append(f"elemento no encontrado: {type(e).__name__} {e}")
+    return result
+
+def check_integrity(data_dir, results):
+    """Verifica los archivos guardados contra lo que cada sesión vio confirmado"""
+    from cli import find_problems
+    from utils.audit import AUDIT_FILE, load_entries
+    from utils.storage import HISTORY_FILE, STUDENTS_FILE
+
+    report = {"corrupcion": [], "escrituras_perdidas": [], "duplicados": [], "advertencias": []}
+    data = {}
+    for filename in (STUDENTS_FILE, HISTORY_FILE):
+        try:
+            with open(os.path.join(data_dir, filename), "r", encoding="utf-8") as f:
+                data[filename] = json.load(f)
+        except (OSError, ValueError) as e:
+            report["corrupcion"].append(f"{filename}: {e}")
+            data[filename] = []
+    leftovers = glob.glob(os.path.join(data_dir, "*.tmp")) + glob.glob(os.path.join(data_dir, ".commit.json"))
+    report["corrupcion"].extend(f"archivo pendiente: {os.path.basename(p)}" for p in leftovers)
+
+    students, history = data[STUDENTS_FILE], data[HISTORY_FILE]
+    names = Counter(s.get('nombre') for s in students)
+    per_student = Counter()
+    for record in history:
+        for name in set(record.get('estudiantes') or ()):
+            per_student[name] += 1
+    logged = Counter()
+    for entry in load_entries(data_dir):
+        if entry["operacion"] == "registrar_limpieza":
+            logged.update(set(entry["cambio"]["registro"]["estudiantes"]))
+
+    for result in results:
+        name = result.student_name
+        if result.student_added and names[name] == 0:
+            report["escrituras_perdidas"].append(f"estudiante {name} no está en {STUDENTS_FILE}")
+        if names[name] > 1:
+            report["duplicados"].append(f"estudiante {name} aparece {names[name]} veces")
+        if per_student[name] < result.cleanings:
+            report["escrituras_perdidas"].append(
+                f"{name}: {result.cleanings} limpieza(s) confirmadas, {per_student[name]} en {HISTORY_FILE}"
+            )
+        elif per_student[name] > result.cleanings:
+            report["duplicados"].append(
+                f"{name}: {result.cleanings} limpieza(s) confirmadas, {per_student[name]} en {HISTORY_FILE}"
+            )
+        if logged[name] != result.cleanings:
+            report["advertencias"].append(
+                f"{name}: {result.cleanings} limpieza(s) confirmadas, {logged[name]} en {AUDIT_FILE}"
+            )
+
+    ids = Counter(s.get('id') for s in students)
+    report["advertencias"].extend(f"id de estudiante repetido: {i} ({n} veces)" for i, n in ids.items() if n > 1)
+    problems = find_problems(students, history)
+    # Los estudiantes e ids repetidos ya se reportan como duplicados y advertencias
+    report["corrupcion"].extend(p for p in problems if "duplicado" not in p and "repetido" not in p)
+    return report
+
+def summarize_latencies(results):
+    from utils.metrics import percentile
+
+    by_action = {}
+    for result in results:
+        for action, seconds in result.latencies:
+            by_action.setdefault(action, []).append(seconds)
+    return {
+        action: {
+            "n": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": max(values) * 1000,
+        }
+        for action, values in sorted(by_action.items())
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones concurrentes de AppTest")
+    parser.add_argument("--sesiones", type=int, default=20, help="Sesiones simultáneas")
+    parser.add_argument("--acciones", type=int, default=10, help="Interacciones por sesión después de registrarse")
+    parser.add_argument("--registros", type=int, default=1000, help="Registros sintéticos iniciales")
+    parser.add_argument("--estudiantes", type=int, default=40, help="Estudiantes sintéticos iniciales")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="Tiempo máximo por ejecución del script (s)")
+    parser.add_argument("--json", help="Archivo donde guardar el reporte")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="limpieza_carga_") as data_dir:
+        # Debe fijarse antes de importar la app o los módulos de datos
+        os.environ["LIMPIEZA_DATA_DIR"] = data_dir
+        from benchmarks.synthetic import write_dataset
+        write_dataset(data_dir, args.registros, args.estudiantes, seed=args.semilla)
+        install_shared_runtime()
+
+        barrier = threading.Barrier(args.sesiones)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sesiones) as pool:
+            futures = [
+                pool.submit(run_session, i, args.acciones, args.semilla, args.timeout, barrier)
+                for i in range(args.sesiones)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        latencies = summarize_latencies(results)
+        integrity = check_integrity(data_dir, results)
+
+    print(f"{args.sesiones} sesión(es), {sum(len(r.latencies) for r in results)} interacción(es) en {elapsed:.1f} s")
+    print(f"{'interacción':<16} {'n':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'máximo':>10}")
+    for action, stats in latencies.items():
+        print(f"{action:<16} {stats['n']:>6} {stats['p50_ms']:>7.0f} ms {stats['p95_ms']:>7.0f} ms "
+              f"{stats['p99_ms']:>7.0f} ms {stats['max_ms']:>7.0f} ms")
+
+    errors = [error for result in results for error in result.errors]
+    print(f"Errores en sesiones: {len(errors)}")
+    for error in sorted(set(errors)):
+        print(f"  - {error}")
+    for key, label in (("escrituras_perdidas", "Escrituras perdidas"), ("corrupcion", "Corrupción"),
+                       ("duplicados", "Duplicados"), ("advertencias", "Advertencias")):
+        print(f"{label}: {len(integrity[key])}")
+        for item in integrity[key]:
+            print(f"  - {item}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "sesiones": args.sesiones,
+                "segundos": elapsed,
+                "latencias": latencies,
+                "errores": errors,
+                "integridad": integrity,
+                "limpiezas_confirmadas": sum(r.cleanings for r in results),
+            }, f, ensure_ascii=False, indent=2)
+    return 1 if integrity["escrituras_perdidas"] or integrity["corrupcion"] or errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
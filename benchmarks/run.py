@@ -0,0 +1,222 @@
+"""Benchmarks de las rutas críticas del sistema.
+
+Genera datos sintéticos por cada tamaño, mide el tiempo (mejor y mediana de
+`--repeticiones`), el rendimiento en registros por segundo, la memoria pico y
+la memoria retenida por el resultado (tracemalloc, en una corrida aparte para
+no distorsionar los tiempos). Con `--compacto` las rutas de consulta usan el
+modelo compacto de utils.records.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --tamanos 1000 100000 1000000 --json resultados.json
+    python -m benchmarks.run --solo load_data save_data
+    python -m benchmarks.run --solo load_clean_data save_clean_data
+    python -m benchmarks.run --compacto --solo load_data_compacto eliminar_conteo
+"""
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from benchmarks.synthetic import write_dataset
+from utils.records import compact_history
+from utils.queries import (
+    build_history_dataframe,
+    build_week_summary,
+    count_student_records,
+    filter_history,
+    get_week_records,
+)
+from utils.storage import (
+    HISTORY_FILE,
+    get_current_week_dates,
+    get_today_ecuador,
+    load_data,
+    save_data,
+    update_cleaning_records_after_deletion,
+    update_cleaning_records_after_edit,
+)
+from utils.validation import load_clean_data, save_clean_data
+
+class Context:
+    """Datos compartidos por los benchmarks de un mismo tamaño"""
+
+    def __init__(self, data_dir, students, history, pdf_limit):
+        self.data_dir = data_dir
+        self.students = students
+        self.history = history
+        self.week_dates = get_current_week_dates()
+        self.week_records = get_week_records(history, self.week_dates)[:pdf_limit]
+        self.student_name = students[len(students) // 2]['nombre']
+        self.today = get_today_ecuador()
+
+# Cada benchmark retorna (preparación, función medida, cantidad de registros procesados).
+# La preparación se ejecuta fuera de la medición y su resultado se pasa a la función.
+def bench_load_data(ctx):
+    return None, lambda _: load_data(HISTORY_FILE, ctx.data_dir), len(ctx.history)
+
+def bench_load_data_compact(ctx):
+    return None, lambda _: compact_history(load_data(HISTORY_FILE, ctx.data_dir)), len(ctx.history)
+
+def bench_save_data(ctx):
+    return None, lambda _: save_data(ctx.history, HISTORY_FILE, ctx.data_dir), len(ctx.history)
+
+# Lo que usa la aplicación: carga y guardado con validación
+def bench_load_clean_data(ctx):
+    return None, lambda _: load_clean_data(ctx.data_dir), len(ctx.history) + len(ctx.students)
+
+def bench_save_clean_data(ctx):
+    # save_clean_data corrige la lista en el lugar: cada corrida recibe una copia
+    return (lambda: list(ctx.history),
+            lambda history: save_clean_data(history=history, known_students=ctx.students, data_dir=ctx.data_dir),
+            len(ctx.history))
+
+def bench_week_summary(ctx):
+    return None, lambda _: build_week_summary(ctx.history, ctx.week_dates), len(ctx.history)
+
+def bench_reportes_filter(ctx):
+    def run(_):
+        filtered = filter_history(ctx.history, "Aula", ctx.today - timedelta(days=7), ctx.today)
+        if filtered:
+            build_history_dataframe(filtered)
+    return None, run, len(ctx.history)
+
+def bench_reportes_filter_all(ctx):
+    def run(_):
+        build_history_dataframe(filter_history(ctx.history))
+    return None, run, len(ctx.history)
+
+def bench_delete_count(ctx):
+    return None, lambda _: count_student_records(ctx.history, ctx.student_name), len(ctx.history)
+
+def bench_update_after_edit(ctx):
+    return (lambda: copy.deepcopy(ctx.history),
+            lambda history: update_cleaning_records_after_edit(history, ctx.student_name, "NOMBRE EDITADO"),
+            len(ctx.history))
+
+def bench_update_after_deletion(ctx):
+    return (lambda: copy.deepcopy(ctx.history),
+            lambda history: update_cleaning_records_after_deletion(history, ctx.student_name),
+            len(ctx.history))
+
+def bench_pdf_reportlab(ctx):
+    from utils.weekly_report import PDF_AVAILABLE, generate_pdf_report
+    if not PDF_AVAILABLE:
+        raise ImportError("reportlab no está disponible")
+    pdf_path = os.path.join(ctx.data_dir, "reporte.pdf")
+    return None, lambda _: generate_pdf_report(ctx.week_records, ctx.week_dates, pdf_path), len(ctx.week_records)
+
+def bench_pdf_fpdf(ctx):
+    from utils.pdf_generator import generate_pdf_report
+    # Esta implementación escribe el PDF en el directorio actual
+    def run(_):
+        cwd = os.getcwd()
+        os.chdir(ctx.data_dir)
+        try:
+            generate_pdf_report(ctx.week_records, ctx.week_dates)
+        finally:
+            os.chdir(cwd)
+    return None, run, len(ctx.week_records)
+
+BENCHMARKS = {
+    "load_data": bench_load_data,
+    "load_data_compacto": bench_load_data_compact,
+    "save_data": bench_save_data,
+    "load_clean_data": bench_load_clean_data,
+    "save_clean_data": bench_save_clean_data,
+    "inicio_resumen_semanal": bench_week_summary,
+    "reportes_filtro_dataframe": bench_reportes_filter,
+    "reportes_todos_dataframe": bench_reportes_filter_all,
+    "eliminar_conteo": bench_delete_count,
+    "update_after_edit": bench_update_after_edit,
+    "update_after_deletion": bench_update_after_deletion,
+    "pdf_reportlab": bench_pdf_reportlab,
+    "pdf_fpdf": bench_pdf_fpdf,
+}
+
+def measure(factory, ctx, repeat):
+    """Ejecuta un benchmark y retorna sus tiempos, rendimiento y memoria pico"""
+    setup, func, records = factory(ctx)
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = func(arg)
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    best = min(times)
+    return {
+        "registros": records,
+        "mejor_s": best,
+        "mediana_s": statistics.median(times),
+        "registros_por_s": records / best if best > 0 else float("inf"),
+        "memoria_pico_mib": (peak - base) / (1024 * 1024),
+        "memoria_retenida_mib": (current - base) / (1024 * 1024),
+    }
+
+def run_size(size, names, repeat, pdf_limit, compact=False):
+    """Corre los benchmarks seleccionados sobre un conjunto sintético de `size` registros"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix=f"limpieza_bench_{size}_") as data_dir:
+        students, history = write_dataset(data_dir, size)
+        if compact:
+            history = compact_history(history)
+        ctx = Context(data_dir, students, history, pdf_limit)
+        for name in names:
+            try:
+                result = measure(BENCHMARKS[name], ctx, repeat)
+            except ImportError as e:
+                print(f"{name:<28} {size:>9}  omitido ({e})")
+                continue
+            except Exception as e:
+                print(f"{name:<28} {size:>9}  falló ({e})")
+                continue
+            result.update({"benchmark": name, "tamano": size})
+            results.append(result)
+            print(f"{name:<28} {size:>9}  {result['mejor_s'] * 1000:>10.2f} ms  "
+                  f"{result['mediana_s'] * 1000:>10.2f} ms  {result['registros_por_s']:>14,.0f}/s  "
+                  f"{result['memoria_pico_mib']:>9.2f} MiB  {result['memoria_retenida_mib']:>9.2f} MiB")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del Sistema de Registro de Limpieza")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 100000],
+                        help="Cantidad de registros sintéticos (p. ej. 1000 100000 1000000)")
+    parser.add_argument("--solo", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks a ejecutar")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--pdf-limite", type=int, default=1000,
+                        help="Máximo de registros de la semana enviados a los PDF")
+    parser.add_argument("--compacto", action="store_true",
+                        help="Usar el modelo compacto de registros en las consultas")
+    parser.add_argument("--json", help="Archivo donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    names = args.solo or list(BENCHMARKS)
+    print(f"{'benchmark':<28} {'tamaño':>9}  {'mejor':>13}  {'mediana':>13}  {'rendimiento':>16}  {'pico':>13}  {'retenida':>13}")
+    results = []
+    for size in args.tamanos:
+        results.extend(run_size(size, names, args.repeticiones, args.pdf_limite, args.compacto))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
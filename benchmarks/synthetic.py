@@ -0,0 +1,78 @@
+"""Generadores de datos sintéticos para los benchmarks.
+
+    python -m benchmarks.synthetic --registros 100000 --salida /tmp/limpieza_100k
+"""
+import argparse
+import json
+import os
+import random
+from datetime import timedelta
+
+from utils.storage import DIAS_SEMANA, HISTORY_FILE, STUDENTS_FILE, get_today_ecuador
+
+NOMBRES = ["ANA", "LUIS", "MARIA", "JOSE", "CARLOS", "SOFIA", "DIEGO", "VALERIA", "MATEO", "CAMILA"]
+APELLIDOS = ["MORA", "PAREDES", "TORRES", "VERA", "CEDEÑO", "ZAMBRANO", "LOOR", "MENDOZA", "BRAVO", "REYES"]
+
+def generate_students(count, seed=0):
+    """Genera `count` estudiantes con nombres únicos"""
+    rng = random.Random(seed)
+    students = []
+    for i in range(count):
+        nombre = f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)} {rng.choice(NOMBRES)} {i:05d}"
+        students.append({
+            'id': f"ST{i + 1:03d}",
+            'nombre': nombre,
+            'fecha_registro': "2025-01-06 07:00:00"
+        })
+    return students
+
+def generate_history(count, students, days=365, seed=0, end_date=None):
+    """Genera `count` registros de limpieza repartidos en los últimos `days` días hábiles"""
+    rng = random.Random(seed)
+    end_date = end_date or get_today_ecuador()
+    school_days = []
+    day = end_date
+    while len(school_days) < days:
+        if day.weekday() < 5:
+            school_days.append(day)
+        day -= timedelta(days=1)
+    school_days.reverse()
+
+    names = [s['nombre'] for s in students]
+    history = []
+    for i in range(count):
+        fecha = school_days[i * len(school_days) // count]
+        seconds = rng.randrange(7 * 3600, 14 * 3600)
+        hora = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        history.append({
+            'fecha': fecha.strftime('%Y-%m-%d'),
+            'dia_semana': DIAS_SEMANA[fecha.weekday()],
+            'hora': hora,
+            'estudiantes': rng.sample(names, rng.randint(1, min(3, len(names)))),
+            'tipo_limpieza': rng.choice(["Aula", "Baños"]),
+            'timestamp': f"{fecha.strftime('%Y-%m-%d')} {hora}"
+        })
+    return history
+
+def write_dataset(data_dir, records, students=None, seed=0):
+    """Escribe students.json y cleaning_history.json sintéticos en `data_dir`"""
+    students = generate_students(students or max(10, min(2000, records // 50)), seed)
+    history = generate_history(records, students, seed=seed)
+    os.makedirs(data_dir, exist_ok=True)
+    for data, filename in ((students, STUDENTS_FILE), (history, HISTORY_FILE)):
+        with open(os.path.join(data_dir, filename), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    return students, history
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos de limpieza")
+    parser.add_argument("--registros", type=int, default=1000)
+    parser.add_argument("--estudiantes", type=int, default=None)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", required=True, help="Directorio de datos a generar")
+    args = parser.parse_args(argv)
+    students, history = write_dataset(args.salida, args.registros, args.estudiantes, args.semilla)
+    print(f"{len(students)} estudiante(s) y {len(history)} registro(s) en {args.salida}")
+
+if __name__ == "__main__":
+    main()
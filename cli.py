@@ -0,0 +1,349 @@
+"""Herramienta de línea de comandos del Sistema de Registro de Limpieza.
+
+Permite generar reportes y dar mantenimiento a los datos sin abrir Streamlit:
+
+    python cli.py reporte --semanas 4 --workers 4
+    python cli.py reporte --curso data/3A --curso data/3B
+    python cli.py resumenes --desde 2025-09-01 --hasta 2025-12-19 --salida resumenes.zip
+    python cli.py validar
+    python cli.py compactar
+    python cli.py migrar
+    python cli.py archivar
+    python cli.py reconstruir --version 12 --salida respaldo/
+"""
+import argparse
+import os
+import sys
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from utils.archive import archive_old_records, get_hot_cutoff, load_archived
+from utils.audit import append_entry, maintenance_changes, reconstruct
+from utils.commit import clean_temp_files
+from utils.records import record_students
+from utils.student_report import build_student_tasks, group_by_student, write_student_zip
+from utils.storage import (
+    DIAS_SEMANA,
+    HISTORY_FILE,
+    STUDENTS_FILE,
+    data_signatures,
+    get_data_dir,
+    get_today_ecuador,
+    get_week_dates,
+    load_data,
+    save_many,
+)
+from utils.validation import (
+    QUARANTINE_FILE,
+    next_student_id,
+    quarantine_report,
+    save_clean_data,
+    unregistered_records,
+    validate_history,
+    validate_students,
+)
+
+def parse_date(value):
+    """Convierte un texto YYYY-MM-DD en fecha para argparse"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Fecha inválida: {value} (use YYYY-MM-DD)")
+
+def get_course_dirs(args):
+    """Retorna los directorios de datos (uno por curso) indicados en la línea de comandos"""
+    return args.curso or [get_data_dir()]
+
+# REPORTES
+def render_week_report(task):
+    """Genera el PDF de una semana; se ejecuta dentro de un proceso del pool"""
+    from utils.weekly_report import generate_pdf_report
+
+    records, week_dates, pdf_path = task
+    return generate_pdf_report(records, week_dates, pdf_path)
+
+def load_history_range(data_dir, start_date, end_date):
+    """Historial activo más las particiones archivadas que incluyen el rango"""
+    history = load_data(HISTORY_FILE, data_dir)
+    if start_date < get_hot_cutoff():
+        history = load_archived(start_date, end_date, data_dir) + history
+    return history
+
+def build_report_tasks(course_dirs, last_week, weeks, output_dir):
+    """Prepara las tareas de reporte agrupando el historial por semana en una sola pasada"""
+    mondays = [last_week - timedelta(weeks=i) for i in range(weeks)]
+    tasks = []
+    for data_dir in course_dirs:
+        records_by_week = {monday: [] for monday in mondays}
+        history = load_history_range(data_dir, mondays[-1], last_week + timedelta(days=4))
+        for record in history:
+            try:
+                fecha = datetime.strptime(record['fecha'], '%Y-%m-%d').date()
+            except (KeyError, TypeError, ValueError):
+                continue
+            monday = fecha - timedelta(days=fecha.weekday())
+            if monday in records_by_week and fecha.weekday() < 5:
+                records_by_week[monday].append(record)
+
+        course_name = os.path.basename(os.path.normpath(data_dir))
+        for monday, records in records_by_week.items():
+            pdf_path = os.path.join(
+                output_dir, course_name, f"reporte_limpieza_semana_{monday.strftime('%Y-%m-%d')}.pdf"
+            )
+            tasks.append((records, get_week_dates(monday), pdf_path))
+    return tasks
+
+def cmd_reporte(args):
+    """Genera reportes semanales en paralelo para varias semanas y cursos"""
+    last_day = args.semana or get_today_ecuador()
+    last_week = get_week_dates(last_day)[0]
+    tasks = build_report_tasks(get_course_dirs(args), last_week, args.semanas, args.salida)
+    if args.omitir_vacias:
+        tasks = [task for task in tasks if task[0]]
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(render_week_report, task): task for task in tasks}
+        for future in as_completed(futures):
+            pdf_path = futures[future][2]
+            try:
+                print(f"✅ {future.result()}")
+            except Exception as e:
+                failures += 1
+                print(f"❌ {pdf_path}: {e}", file=sys.stderr)
+
+    print(f"{len(tasks) - failures} reporte(s) generado(s), {failures} error(es).")
+    return 1 if failures else 0
+
+def cmd_resumenes(args):
+    """Genera un resumen PDF por estudiante y los entrega en un solo ZIP"""
+    end_date = args.hasta or get_today_ecuador()
+    tasks = []
+    for data_dir in get_course_dirs(args):
+        history = load_history_range(data_dir, args.desde, end_date)
+        records = [r for r in history if _record_in_range(r, args.desde, end_date)]
+        students = [s.get('nombre') for s in load_data(STUDENTS_FILE, data_dir)]
+        course_name = os.path.basename(os.path.normpath(data_dir))
+        tasks.extend(build_student_tasks(group_by_student(records, students), args.desde, end_date,
+                                         prefix=f"{course_name}/", skip_empty=args.omitir_vacios))
+
+    def progress(done, total, student_name):
+        print(f"[{done}/{total}] {student_name}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    with open(args.salida, "wb") as f:
+        failures = write_student_zip(f, tasks, workers=args.workers, progress=progress)
+    for archive_name, error in failures:
+        print(f"❌ {archive_name}: {error}", file=sys.stderr)
+    print(f"{len(tasks) - len(failures)} resumen(es) en {args.salida}, {len(failures)} error(es).")
+    return 1 if failures else 0
+
+def _record_in_range(record, start_date, end_date):
+    try:
+        return start_date <= datetime.strptime(record['fecha'], '%Y-%m-%d').date() <= end_date
+    except (KeyError, TypeError, ValueError):
+        return False
+
+# MANTENIMIENTO DE DATOS
+def find_problems(students, history):
+    """Problemas de los datos según las reglas de utils.validation (las mismas que aplica la aplicación)"""
+    problems = []
+    students, rejected, reassigned = validate_students(
+        [dict(s) if isinstance(s, Mapping) else s for s in students]
+    )
+    for student, reasons in rejected:
+        problems.append(f"Estudiante {student!r}: {', '.join(reasons)}")
+    if reassigned:
+        problems.append(f"{reassigned} estudiante(s) sin id o con id duplicado (se reasignan al cargar)")
+    history, rejected, normalized = validate_history(history)
+    for record, reasons in rejected:
+        problems.append(f"Registro {record!r}: {', '.join(reasons)}")
+    if normalized:
+        problems.append(f"{normalized} registro(s) con fecha, día, hora, área o timestamp a normalizar al cargar")
+    for record in unregistered_records(history, students):
+        problems.append(f"Registro {record['fecha']} {record['hora']} {record['tipo_limpieza']}: "
+                        f"estudiantes no registrados ({', '.join(record_students(record))})")
+    return problems
+
+def cmd_validar(args):
+    """Valida la consistencia de los datos de cada curso"""
+    exit_code = 0
+    for data_dir in get_course_dirs(args):
+        problems = find_problems(load_data(STUDENTS_FILE, data_dir), load_data(HISTORY_FILE, data_dir))
+        print(f"📁 {data_dir}: {len(problems)} problema(s)")
+        for problem in problems:
+            print(f"  - {problem}")
+        quarantined = quarantine_report(data_dir)
+        if quarantined:
+            print(f"  En cuarentena ({QUARANTINE_FILE}):")
+            for (filename, reason), count in quarantined.most_common():
+                print(f"  - {filename}: {reason} ({count})")
+        if problems:
+            exit_code = 1
+    return exit_code
+
+def print_save_failure(data_dir, expected):
+    """Explica por qué no se guardó: otro proceso cambió los datos o falló la escritura"""
+    current = data_signatures(data_dir)
+    if any(current[filename] != signature for filename, signature in expected.items()):
+        print(f"⚠️ {data_dir}: los datos cambiaron mientras se procesaban (otra sesión guardó); "
+              "no se sobrescribieron, vuelva a ejecutar el comando")
+    else:
+        print(f"❌ {data_dir}: no se pudieron guardar los datos")
+
+def save_maintenance(command, data_dir, students_before, students, history_before, history, expected):
+    """Valida y guarda el resultado de un mantenimiento y lo agrega al registro de cambios.
+
+    `expected` son las firmas de los archivos al cargarlos: si la aplicación
+    guardó mientras tanto, no se sobrescribe nada.
+    """
+    # La validación corrige las listas en el lugar: el cambio se calcula con lo que se guardó
+    if not save_clean_data(students, history, data_dir=data_dir, expected=expected):
+        print_save_failure(data_dir, expected)
+        return False
+    change = maintenance_changes(command, students_before, students, history_before, history)
+    if change["eliminados"] or change["agregados"] or "estudiantes" in change:
+        append_entry("mantenimiento", change, data_dir)
+    return True
+
+def cmd_compactar(args):
+    """Elimina duplicados y registros vacíos, ordena el historial y limpia temporales"""
+    exit_code = 0
+    for data_dir in get_course_dirs(args):
+        # Las firmas se toman antes de leer: un guardado posterior se detecta al guardar
+        expected = data_signatures(data_dir)
+        students_before = load_data(STUDENTS_FILE, data_dir)
+        students = [dict(student) for student in students_before]
+        history = load_data(HISTORY_FILE, data_dir)
+        seen = set()
+        compacted = []
+        for record in history:
+            if not record.get('estudiantes'):
+                continue
+            key = (record.get('fecha'), record.get('hora'), record.get('tipo_limpieza'),
+                   tuple(record.get('estudiantes')))
+            if key in seen:
+                continue
+            seen.add(key)
+            compacted.append(record)
+        compacted.sort(key=lambda r: (str(r.get('fecha')), str(r.get('hora'))))
+
+        if not save_maintenance("compactar", data_dir, students_before, students, history, compacted, expected):
+            exit_code = 1
+        clean_temp_files(data_dir)
+        print(f"📁 {data_dir}: {len(history)} -> {len(compacted)} registro(s)")
+    return exit_code
+
+def migrate_record(record):
+    """Completa y normaliza los campos de un registro con formato antiguo"""
+    migrated = dict(record)
+    migrated['estudiantes'] = [str(s).strip().upper() for s in record.get('estudiantes') or []]
+    tipo = str(record.get('tipo_limpieza', '')).strip().capitalize()
+    migrated['tipo_limpieza'] = 'Baños' if tipo in ('Baños', 'Banos', 'Baño', 'Bano') else tipo
+    try:
+        fecha = datetime.strptime(record['fecha'], '%Y-%m-%d')
+    except (KeyError, TypeError, ValueError):
+        return migrated
+    migrated['dia_semana'] = DIAS_SEMANA[fecha.weekday()]
+    migrated.setdefault('hora', '00:00:00')
+    migrated.setdefault('timestamp', f"{record['fecha']} {migrated['hora']}")
+    return migrated
+
+def cmd_migrar(args):
+    """Migra los datos al formato actual de estudiantes y registros"""
+    exit_code = 0
+    for data_dir in get_course_dirs(args):
+        expected = data_signatures(data_dir)
+        students_before = load_data(STUDENTS_FILE, data_dir)
+        students = [dict(student) for student in students_before]
+        for student in students:
+            student['nombre'] = str(student.get('nombre', '')).strip().upper()
+            student.setdefault('fecha_registro', student.get('fecha_actualizacion', ''))
+        for student in students:
+            if not student.get('id'):
+                student['id'] = next_student_id(students)
+        history_before = load_data(HISTORY_FILE, data_dir)
+        history = [migrate_record(record) for record in history_before]
+
+        if not save_maintenance("migrar", data_dir, students_before, students, history_before, history, expected):
+            exit_code = 1
+        print(f"📁 {data_dir}: {len(students)} estudiante(s), {len(history)} registro(s) migrados")
+    return exit_code
+
+def cmd_archivar(args):
+    """Mueve los registros antiguos a las particiones mensuales del archivo"""
+    exit_code = 0
+    for data_dir in get_course_dirs(args):
+        expected = {HISTORY_FILE: data_signatures(data_dir)[HISTORY_FILE]}
+        history = load_data(HISTORY_FILE, data_dir)
+        hot_records, moved = archive_old_records(history, data_dir)
+        # Si el historial cambió, los registros quedan también en el historial activo; repetir
+        # el comando es seguro porque las particiones no duplican los registros que ya tienen
+        if moved and not save_clean_data(history=hot_records, known_students=load_data(STUDENTS_FILE, data_dir),
+                                         data_dir=data_dir, expected=expected):
+            print_save_failure(data_dir, expected)
+            exit_code = 1
+        print(f"📁 {data_dir}: {moved} registro(s) archivados, {len(hot_records)} en el historial activo")
+    return exit_code
+
+def cmd_reconstruir(args):
+    """Escribe los datos tal como estaban en una versión o momento del registro de cambios"""
+    exit_code = 0
+    for data_dir in get_course_dirs(args):
+        students, history = reconstruct(args.version, args.momento, data_dir)
+        output_dir = os.path.join(args.salida, os.path.basename(os.path.normpath(data_dir)))
+        os.makedirs(output_dir, exist_ok=True)
+        if not save_many({STUDENTS_FILE: students, HISTORY_FILE: history}, output_dir):
+            exit_code = 1
+        print(f"📁 {data_dir} -> {output_dir}: {len(students)} estudiante(s), {len(history)} registro(s)")
+    return exit_code
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--curso", action="append", metavar="DIR",
+                        help="Directorio de datos de un curso (se puede repetir)")
+
+    parser = argparse.ArgumentParser(description="Sistema de Registro de Limpieza (sin interfaz)")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    reporte = subparsers.add_parser("reporte", parents=[common], help="Genera reportes semanales en PDF")
+    reporte.add_argument("--semana", type=parse_date,
+                         help="Cualquier fecha de la última semana a reportar (por defecto hoy)")
+    reporte.add_argument("--semanas", type=int, default=1, help="Cantidad de semanas hacia atrás")
+    reporte.add_argument("--salida", default="reportes", help="Directorio de salida de los PDF")
+    reporte.add_argument("--workers", type=int, default=None, help="Procesos en paralelo")
+    reporte.add_argument("--omitir-vacias", action="store_true", help="No generar semanas sin registros")
+    reporte.set_defaults(func=cmd_reporte)
+
+    resumenes = subparsers.add_parser("resumenes", parents=[common],
+                                      help="Genera un resumen PDF por estudiante en un ZIP")
+    resumenes.add_argument("--desde", type=parse_date, required=True, help="Primera fecha (YYYY-MM-DD)")
+    resumenes.add_argument("--hasta", type=parse_date, help="Última fecha (por defecto hoy)")
+    resumenes.add_argument("--salida", default=os.path.join("reportes", "resumenes_estudiantes.zip"),
+                           help="Archivo ZIP de salida")
+    resumenes.add_argument("--workers", type=int, default=None, help="Procesos en paralelo")
+    resumenes.add_argument("--omitir-vacios", action="store_true", help="No generar estudiantes sin registros")
+    resumenes.set_defaults(func=cmd_resumenes)
+
+    subparsers.add_parser("validar", parents=[common], help="Valida los datos").set_defaults(func=cmd_validar)
+    subparsers.add_parser("compactar", parents=[common], help="Compacta el historial").set_defaults(func=cmd_compactar)
+    subparsers.add_parser("migrar", parents=[common], help="Migra los datos al formato actual").set_defaults(func=cmd_migrar)
+    subparsers.add_parser("archivar", parents=[common],
+                          help="Archiva los registros antiguos por mes").set_defaults(func=cmd_archivar)
+
+    reconstruir = subparsers.add_parser("reconstruir", parents=[common],
+                                        help="Reconstruye los datos en una versión o momento anterior")
+    punto = reconstruir.add_mutually_exclusive_group(required=True)
+    punto.add_argument("--version", type=int, help="Última versión del registro de cambios a conservar")
+    punto.add_argument("--momento", help="Último instante a conservar (YYYY-MM-DD HH:MM:SS)")
+    reconstruir.add_argument("--salida", required=True, help="Directorio donde escribir los datos reconstruidos")
+    reconstruir.set_defaults(func=cmd_reconstruir)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
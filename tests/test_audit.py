@@ -0,0 +1,29 @@
+"""Regresiones de deshacer"""
+from utils import audit
+from utils.storage import save_data
+from utils.validation import load_clean_data, save_clean_data
+
+RECORD = {"fecha": "2024-01-01", "dia_semana": "Lunes", "hora": "08:00:00", "tipo_limpieza": "Aula",
+          "estudiantes": ["A"], "timestamp": "2024-01-01 08:00:00"}
+
+def test_undo_aborts_when_record_changed(tmp_path):
+    data_dir = str(tmp_path)
+    save_data([{"id": "ST001", "nombre": "A"}], "students.json", data_dir)
+    save_data([RECORD], "cleaning_history.json", data_dir)
+    audit.append_entry("registrar_limpieza", {"pos": 0, "registro": RECORD}, data_dir, "s1")
+
+    # Otra sesión renombra A -> Z
+    students, history = load_clean_data(data_dir)
+    changes = audit.student_record_changes(history, "A")
+    renamed = {"id": "ST001", "nombre": "Z"}
+    history[0]['estudiantes'] = ["Z"]
+    save_clean_data([renamed], history, data_dir=data_dir)
+    audit.append_entry("editar_estudiante", {"pos": 0, "antes": students[0], "despues": renamed,
+                                              "registros": changes}, data_dir, "s2")
+
+    students, history = load_clean_data(data_dir)
+    entry, ok = audit.undo_last(students, history, data_dir, "s1")
+    assert entry["operacion"] == "registrar_limpieza" and not ok
+    assert [r['estudiantes'] for r in history] == [["Z"]]
+    assert [e["operacion"] for e in audit.load_entries(data_dir)] == ["registrar_limpieza", "editar_estudiante"]
+    assert load_clean_data(data_dir)[1] == history
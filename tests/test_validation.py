@@ -0,0 +1,37 @@
+"""Regresiones de la validación del historial"""
+import json
+import os
+
+import pytest
+
+from utils.validation import QUARANTINE_FILE, load_clean_data, validate_history
+
+VALID = {"fecha": "2024-01-01", "hora": "08:00:00", "tipo_limpieza": "Aula", "estudiantes": ["A"]}
+
+@pytest.mark.parametrize("column", ["fecha", "hora", "tipo_limpieza", "timestamp"])
+def test_missing_column(column):
+    records = [{k: v for k, v in VALID.items() if k != column}]
+    clean, rejected, _ = validate_history(records)
+    if column in ("hora", "timestamp"):
+        # Sin hora se usa 00:00:00; el timestamp se recalcula
+        assert len(clean) == 1 and not rejected
+    else:
+        assert not clean and len(rejected) == 1
+
+@pytest.mark.parametrize("column", ["fecha", "hora", "tipo_limpieza", "timestamp"])
+def test_invalid_column(column):
+    for value in (5, "x", [1]):
+        clean, rejected, _ = validate_history([dict(VALID, **{column: value})])
+        if column == "timestamp":
+            assert clean[0]["timestamp"] == "2024-01-01 08:00:00"
+        else:
+            assert not clean and len(rejected) == 1
+
+def test_load_without_dates(tmp_path):
+    with open(tmp_path / "students.json", "w", encoding="utf-8") as f:
+        json.dump([{"id": "ST001", "nombre": "A"}], f)
+    with open(tmp_path / "cleaning_history.json", "w", encoding="utf-8") as f:
+        json.dump([{"estudiantes": ["A"], "tipo_limpieza": "Aula"}], f)
+    students, history = load_clean_data(str(tmp_path))
+    assert len(students) == 1 and history == []
+    assert os.path.exists(tmp_path / QUARANTINE_FILE)
@@ -0,0 +1,218 @@
+"""Agregados (rollups) para la página de Analítica.
+
+En lugar de recorrer el historial en cada ejecución, se mantienen contadores:
+
+- limpiezas por semana (lunes) y estudiante,
+- limpiezas por estudiante y área,
+- limpiezas por día hábil y área (para detectar días sin Aula o Baños).
+
+Los contadores de cada partición del archivo se calculan una vez por versión
+del archivo, y los del historial activo se actualizan con las entradas nuevas
+del registro de cambios (`registrar_limpieza`) sin releer el historial; el
+historial y el registro de cambios se leen con `data_lock` tomado, así que
+cada entrada posterior a la versión leída se suma exactamente una vez. El
+resultado combinado se guarda por versión de los datos, así que las gráficas
+no dependen del tamaño del historial.
+"""
+import os
+import threading
+from collections import Counter
+from datetime import timedelta
+
+import pandas as pd
+
+from utils.archive import ARCHIVE_DIR, INDEX_FILE, list_partitions, load_partition, partition_filename
+from utils.audit import load_entries
+from utils.metrics import inc, timed_function
+from utils.records import AREAS, CleaningRecord, record_date, record_students
+from utils.storage import DIAS_SEMANA, HISTORY_FILE, data_lock, get_data_dir, get_today_ecuador, load_data
+
+_AREA_INDEX = {name: i for i, name in enumerate(AREAS)}
+
+class Rollup:
+    """Contadores agregados de un conjunto de registros de limpieza"""
+
+    __slots__ = ("weeks", "areas", "days", "records")
+
+    def __init__(self):
+        self.weeks = {}    # ordinal del lunes -> Counter(estudiante)
+        self.areas = {}    # estudiante -> [aula, baños]
+        self.days = {}     # ordinal del día hábil -> [aula, baños]
+        self.records = 0
+
+    def add(self, record):
+        """Suma un registro a los contadores"""
+        if type(record) is CleaningRecord:
+            ordinal, area = record.date_ordinal, record.area_code
+        else:
+            try:
+                ordinal = record_date(record).toordinal()
+            except (KeyError, TypeError, ValueError):
+                return
+            area = _AREA_INDEX.get(record.get('tipo_limpieza'))
+        weekday = (ordinal - 1) % 7
+        week = self.weeks.setdefault(ordinal - weekday, Counter())
+        for name in set(record_students(record)):
+            week[name] += 1
+            if area is not None:
+                self.areas.setdefault(name, [0, 0])[area] += 1
+        if area is not None and weekday < 5:
+            self.days.setdefault(ordinal, [0, 0])[area] += 1
+        self.records += 1
+
+    def update(self, other):
+        """Suma los contadores de otro rollup"""
+        for monday, counts in other.weeks.items():
+            self.weeks.setdefault(monday, Counter()).update(counts)
+        for name, (aula, banos) in other.areas.items():
+            totals = self.areas.setdefault(name, [0, 0])
+            totals[0] += aula
+            totals[1] += banos
+        for ordinal, (aula, banos) in other.days.items():
+            totals = self.days.setdefault(ordinal, [0, 0])
+            totals[0] += aula
+            totals[1] += banos
+        self.records += other.records
+
+    def copy(self):
+        result = Rollup()
+        result.update(self)
+        return result
+
+def build_rollup(records):
+    """Calcula el rollup de una lista de registros"""
+    rollup = Rollup()
+    for record in records:
+        rollup.add(record)
+    return rollup
+
+# CACHÉ POR VERSIÓN DE LOS DATOS
+class _State:
+    __slots__ = ("key", "version", "hot_signature", "hot", "partitions", "archived", "merged")
+
+_states = {}
+_lock = threading.Lock()
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _partition_rollups(data_dir, previous):
+    """Rollup de cada partición archivada; solo se recalculan las que cambiaron"""
+    partitions = {}
+    for key in list_partitions(data_dir):
+        signature = _signature(os.path.join(data_dir, partition_filename(key)))
+        cached = previous.get(key)
+        if cached and cached[0] == signature:
+            partitions[key] = cached
+        else:
+            partitions[key] = (signature, build_rollup(load_partition(key, data_dir)))
+    return partitions
+
+def _hot_rollup(state, entries, hot_signature, data_dir):
+    """Actualiza el rollup del historial activo con las entradas nuevas del registro de cambios.
+
+    Se llama con `data_lock` tomado: el historial incluye exactamente las
+    entradas hasta `state.version`, así que cada entrada nueva es un registro
+    más (dos limpiezas iguales en el mismo segundo son dos registros).
+    """
+    if state is not None:
+        if hot_signature == state.hot_signature:
+            return state.hot
+        new_entries = entries[state.version:]
+        if new_entries and new_entries[0]["version"] == state.version + 1 \
+           and all(e["operacion"] == "registrar_limpieza" for e in new_entries):
+            for entry in new_entries:
+                state.hot.add(entry["cambio"]["registro"])
+            return state.hot
+    # Cualquier otro cambio (edición, eliminación, deshacer, archivo): recalcular
+    return build_rollup(load_data(HISTORY_FILE, data_dir))
+
+@timed_function("limpieza_query_seconds", consulta="rollup_analitica")
+def get_rollup(data_dir=None):
+    """Retorna el rollup de todo el historial (activo y archivado) para la versión actual de los datos.
+
+    El resultado se comparte entre sesiones: es de solo lectura.
+    """
+    data_dir = os.path.abspath(data_dir or get_data_dir())
+    with _lock:
+        # Las sesiones guardan el historial y agregan su entrada con este candado tomado
+        with data_lock(data_dir):
+            entries = load_entries(data_dir)
+            version = entries[-1]["version"] if entries else 0
+            hot_signature = _signature(os.path.join(data_dir, HISTORY_FILE))
+            index_signature = _signature(os.path.join(data_dir, ARCHIVE_DIR, INDEX_FILE))
+            key = (version, hot_signature, index_signature)
+
+            state = _states.get(data_dir)
+            if state is not None and state.key == key:
+                inc("limpieza_cache_requests_total", cache="analitica", resultado="hit")
+                return state.merged
+            inc("limpieza_cache_requests_total", cache="analitica", resultado="miss")
+            hot = _hot_rollup(state, entries, hot_signature, data_dir)
+
+        new_state = _State()
+        new_state.key = key
+        new_state.version = version
+        new_state.hot_signature = hot_signature
+        new_state.hot = hot
+        if state is not None and state.key[2] == index_signature:
+            new_state.partitions, new_state.archived = state.partitions, state.archived
+        else:
+            new_state.partitions = _partition_rollups(data_dir, state.partitions if state else {})
+            new_state.archived = Rollup()
+            for _, rollup in new_state.partitions.values():
+                new_state.archived.update(rollup)
+        new_state.merged = new_state.archived.copy()
+        new_state.merged.update(new_state.hot)
+        _states[data_dir] = new_state
+        return new_state.merged
+
+# VISTAS
+def recent_mondays(weeks, today=None):
+    """Lunes de las últimas `weeks` semanas, del más antiguo al actual"""
+    today = today or get_today_ecuador()
+    monday = today - timedelta(days=today.weekday())
+    return [monday - timedelta(weeks=i) for i in range(weeks - 1, -1, -1)]
+
+def student_week_matrix(rollup, mondays, students=None):
+    """Tabla larga (estudiante, semana, limpiezas) para el mapa de calor"""
+    names = students if students is not None else sorted(rollup.areas)
+    rows = []
+    for monday in mondays:
+        counts = rollup.weeks.get(monday.toordinal(), {})
+        label = monday.strftime('%d/%m/%Y')
+        for name in names:
+            rows.append({'Estudiante': name, 'Semana': label, 'Limpiezas': counts.get(name, 0)})
+    return pd.DataFrame(rows, columns=['Estudiante', 'Semana', 'Limpiezas'])
+
+def area_balance(rollup, students=None):
+    """Limpiezas por estudiante y área, de mayor a menor carga"""
+    names = students if students is not None else sorted(rollup.areas)
+    rows = [
+        {'Estudiante': name, 'Aula': rollup.areas.get(name, [0, 0])[0], 'Baños': rollup.areas.get(name, [0, 0])[1]}
+        for name in names
+    ]
+    df = pd.DataFrame(rows, columns=['Estudiante', 'Aula', 'Baños'])
+    df['Total'] = df['Aula'] + df['Baños']
+    return df.sort_values(['Total', 'Estudiante'], ascending=[False, True]).reset_index(drop=True)
+
+def compliance_gaps(rollup, start_date, end_date):
+    """Días hábiles (lunes a viernes) del rango sin registro de Aula o de Baños"""
+    gaps = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() < 5:
+            counts = rollup.days.get(day.toordinal(), (0, 0))
+            missing = [area for area, count in zip(AREAS, counts) if count == 0]
+            if missing:
+                gaps.append({
+                    'Fecha': day.strftime('%d/%m/%Y'),
+                    'Día': DIAS_SEMANA[day.weekday()],
+                    'Sin registro': ' y '.join(missing),
+                })
+        day += timedelta(days=1)
+    return pd.DataFrame(gaps, columns=['Fecha', 'Día', 'Sin registro'])
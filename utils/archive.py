@@ -0,0 +1,216 @@
+"""Archivo mensual del historial de limpieza.
+
+El archivo `cleaning_history.json` conserva solo los meses recientes (los que
+usan el Dashboard y el rango por defecto de Reportes). Los registros más
+antiguos se mueven a particiones mensuales `archivo/historial_YYYY-MM.json`
+que solo se leen cuando se consulta un rango de fechas que las incluye.
+
+`archivo/indice.json` guarda, por partición, la cantidad de registros y de
+apariciones por estudiante para responder conteos sin abrir las particiones.
+"""
+import os
+from datetime import date
+
+from utils.logging_config import get_logger
+from utils.metrics import inc
+from utils.records import compact_history, record_date
+from utils.storage import (
+    get_data_dir,
+    get_today_ecuador,
+    load_data,
+    save_data,
+    update_cleaning_records_after_deletion,
+    update_cleaning_records_after_edit,
+)
+
+logger = get_logger("archive")
+
+ARCHIVE_DIR = "archivo"
+INDEX_FILE = "indice.json"
+# Meses que permanecen en cleaning_history.json (el actual y el anterior)
+HOT_MONTHS = 2
+
+_file_cache = {}
+
+def get_archive_dir(data_dir=None):
+    """Retorna (y crea) el directorio de particiones archivadas"""
+    archive_dir = os.path.join(data_dir or get_data_dir(), ARCHIVE_DIR)
+    os.makedirs(archive_dir, exist_ok=True)
+    return archive_dir
+
+def partition_key(fecha):
+    """Retorna la clave YYYY-MM de la partición de una fecha"""
+    return fecha.strftime('%Y-%m')
+
+def partition_filename(key):
+    return os.path.join(ARCHIVE_DIR, f"historial_{key}.json")
+
+def get_hot_cutoff(today=None):
+    """Primer día del mes más antiguo que se mantiene en el historial activo"""
+    today = today or get_today_ecuador()
+    month_index = today.year * 12 + today.month - 1 - (HOT_MONTHS - 1)
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def _record_date(record):
+    try:
+        return record_date(record)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _record_key(record):
+    return (record.get('fecha'), record.get('hora'), record.get('timestamp'),
+            record.get('tipo_limpieza'), tuple(record.get('estudiantes') or ()))
+
+def _partition_stats(records):
+    students = {}
+    for record in records:
+        for name in record['estudiantes']:
+            students[name] = students.get(name, 0) + 1
+    return {"registros": len(records), "estudiantes": students}
+
+def _load_cached(filename, data_dir, transform=None):
+    """Carga un archivo del archivo histórico; reutiliza la copia en memoria mientras no cambie"""
+    filepath = os.path.join(data_dir, filename)
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return []
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_cache.get(filepath)
+    if cached and cached[0] == signature:
+        inc("limpieza_cache_requests_total", cache="archivo", resultado="hit")
+        return cached[1]
+    inc("limpieza_cache_requests_total", cache="archivo", resultado="miss")
+    records = load_data(filename, data_dir)
+    if transform is not None:
+        records = transform(records)
+    _file_cache[filepath] = (signature, records)
+    return records
+
+def _save_uncached(data, filename, data_dir):
+    _file_cache.pop(os.path.join(data_dir, filename), None)
+    return save_data(data, filename, data_dir)
+
+# ÍNDICE
+def load_index(data_dir=None):
+    """Retorna {YYYY-MM: {"registros": n, "estudiantes": {nombre: n}}}"""
+    entries = _load_cached(os.path.join(ARCHIVE_DIR, INDEX_FILE), data_dir or get_data_dir())
+    return {entry["particion"]: entry for entry in entries if isinstance(entry, dict) and "particion" in entry}
+
+def save_index(index, data_dir=None):
+    data_dir = data_dir or get_data_dir()
+    get_archive_dir(data_dir)
+    entries = [dict(entry, particion=key) for key, entry in sorted(index.items())]
+    return _save_uncached(entries, os.path.join(ARCHIVE_DIR, INDEX_FILE), data_dir)
+
+def list_partitions(data_dir=None):
+    """Retorna las claves YYYY-MM de las particiones archivadas, en orden"""
+    return sorted(load_index(data_dir))
+
+def archived_record_count(data_dir=None):
+    """Cantidad total de registros archivados"""
+    return sum(entry["registros"] for entry in load_index(data_dir).values())
+
+def archived_student_count(student_name, data_dir=None):
+    """Cantidad de registros archivados en los que aparece un estudiante"""
+    return sum(entry["estudiantes"].get(student_name, 0) for entry in load_index(data_dir).values())
+
+# PARTICIONES
+def load_partition(key, data_dir=None):
+    """Carga una partición mensual (solo lectura: la lista se comparte entre sesiones)"""
+    return _load_cached(partition_filename(key), data_dir or get_data_dir(), compact_history)
+
+def _save_partition(key, records, data_dir):
+    get_archive_dir(data_dir)
+    return _save_uncached(records, partition_filename(key), data_dir)
+
+def load_archived(start_date, end_date, data_dir=None):
+    """Retorna los registros archivados entre start_date y end_date (inclusivo)"""
+    data_dir = data_dir or get_data_dir()
+    first, last = partition_key(start_date), partition_key(end_date)
+    records = []
+    for key in list_partitions(data_dir):
+        if first <= key <= last:
+            records.extend(load_partition(key, data_dir))
+    return records
+
+def archive_old_records(cleaning_history, data_dir=None, today=None):
+    """Mueve los registros anteriores al corte a sus particiones mensuales.
+
+    Retorna (registros_recientes, cantidad_archivada). Quien llama debe guardar
+    los registros recientes en cleaning_history.json. Las particiones se
+    escriben antes, y los registros ya presentes en ellas no se duplican, así
+    que repetir el proceso tras una interrupción es seguro.
+    """
+    data_dir = data_dir or get_data_dir()
+    cutoff = get_hot_cutoff(today)
+    hot_records = []
+    old_by_partition = {}
+    for record in cleaning_history:
+        fecha = _record_date(record)
+        if fecha is None or fecha >= cutoff:
+            hot_records.append(record)
+        else:
+            old_by_partition.setdefault(partition_key(fecha), []).append(record)
+
+    if not old_by_partition:
+        return cleaning_history, 0
+
+    index = load_index(data_dir)
+    moved = 0
+    for key, records in sorted(old_by_partition.items()):
+        partition = list(load_partition(key, data_dir))
+        existing = {_record_key(r) for r in partition}
+        new_records = [r for r in records if _record_key(r) not in existing]
+        partition.extend(new_records)
+        partition.sort(key=lambda r: (r['fecha'], str(r.get('hora'))))
+        if not _save_partition(key, partition, data_dir):
+            # Si no se pudo archivar, los registros permanecen en el historial activo
+            hot_records.extend(records)
+            continue
+        index[key] = _partition_stats(partition)
+        moved += len(records)
+
+    save_index(index, data_dir)
+    logger.info("archived", extra={"registros": moved, "particiones": sorted(old_by_partition)})
+    return hot_records, moved
+
+# ACTUALIZACIONES DE ESTUDIANTES EN EL ARCHIVO
+def archived_partitions_with(student_name, data_dir=None):
+    """Retorna {YYYY-MM: registros} de las particiones donde aparece el estudiante"""
+    data_dir = data_dir or get_data_dir()
+    return {
+        key: load_partition(key, data_dir)
+        for key, entry in sorted(load_index(data_dir).items())
+        if student_name in entry["estudiantes"]
+    }
+
+def rewrite_partitions(transforms, data_dir=None):
+    """Aplica {YYYY-MM: transform(registros) -> registros} y actualiza el índice"""
+    data_dir = data_dir or get_data_dir()
+    index = load_index(data_dir)
+    ok = True
+    for key, transform in sorted(transforms.items()):
+        partition = transform([dict(r) for r in load_partition(key, data_dir)])
+        if not _save_partition(key, partition, data_dir):
+            ok = False
+            continue
+        index[key] = _partition_stats(partition)
+    return save_index(index, data_dir) and ok
+
+def _rewrite_partitions_with(student_name, transform, data_dir):
+    keys = archived_partitions_with(student_name, data_dir)
+    return rewrite_partitions({key: transform for key in keys}, data_dir)
+
+def update_archives_after_edit(old_name, new_name, data_dir=None):
+    """Renombra al estudiante en las particiones donde aparece"""
+    def transform(records):
+        update_cleaning_records_after_edit(records, old_name, new_name)
+        return records
+    return _rewrite_partitions_with(old_name, transform, data_dir)
+
+def update_archives_after_deletion(student_name, data_dir=None):
+    """Quita al estudiante de las particiones donde aparece"""
+    return _rewrite_partitions_with(
+        student_name, lambda records: update_cleaning_records_after_deletion(records, student_name), data_dir
+    )
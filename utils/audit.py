@@ -0,0 +1,475 @@
+"""Registro de cambios (auditoría) con deshacer.
+
+Cada operación sobre los datos (agregar, editar o eliminar un estudiante y
+registrar una limpieza) agrega una línea JSON a `auditoria.jsonl` con solo
+lo que cambió:
+
+- la posición y el contenido del estudiante antes/después,
+- la posición, clave (fecha, hora, área) y lista original de estudiantes de
+  cada registro de limpieza afectado, y el registro completo cuando la
+  operación lo elimina,
+- lo mismo para las particiones del archivo mensual (`archivo`).
+
+Los comandos de mantenimiento de `cli.py` (`compactar`, `migrar`) agregan una
+entrada `mantenimiento` con los registros que quitaron y agregaron, para que
+`reconstruct` pueda atravesarlos (el contenido se recupera, no el orden que
+tenía el historial); las operaciones anteriores a un mantenimiento ya no se
+pueden deshacer.
+
+Cada entrada guarda también la sesión de la aplicación que la hizo (`sesion`),
+y cada sesión solo deshace sus propias operaciones.
+
+Con esos cambios cada operación se puede aplicar hacia atrás (deshacer) o
+hacia adelante. Deshacer solo toca los registros del cambio: las posiciones
+guardadas se usan directamente y solo si ya no coinciden se busca el
+registro por su clave; si alguno ya no está (otra sesión lo cambió), no se
+deshace nada. Deshacer agrega una entrada `deshacer`; el archivo nunca se
+reescribe. `reconstruct` recorre el registro de cambios hacia atrás
+desde los datos actuales para obtener el estado en una versión o momento.
+"""
+import json
+import os
+import threading
+from datetime import date
+
+from utils.archive import archived_partitions_with, load_archived, load_partition, rewrite_partitions
+from utils.logging_config import get_logger
+from utils.records import CleaningRecord, compact_history, compact_record, record_students
+from utils.storage import (
+    HISTORY_FILE,
+    STUDENTS_FILE,
+    get_data_dir,
+    get_now_ecuador,
+    load_data,
+)
+from utils.validation import save_clean_data
+
+logger = get_logger("audit")
+
+AUDIT_FILE = "auditoria.jsonl"
+
+OPERATIONS = {
+    "agregar_estudiante": "Agregar estudiante",
+    "editar_estudiante": "Editar estudiante",
+    "eliminar_estudiante": "Eliminar estudiante",
+    "registrar_limpieza": "Registrar limpieza",
+    "deshacer": "Deshacer",
+    "mantenimiento": "Mantenimiento",
+}
+
+_lock = threading.Lock()
+# {ruta: (bytes leídos, entradas)}: el archivo solo crece, se leen las líneas nuevas
+_entries_cache = {}
+
+def _audit_path(data_dir):
+    return os.path.join(data_dir or get_data_dir(), AUDIT_FILE)
+
+# LECTURA Y ESCRITURA DEL REGISTRO
+def _read_entries(path):
+    offset, entries = _entries_cache.get(path, (0, []))
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return []
+    if size < offset:
+        # El archivo fue reemplazado: leerlo de nuevo completo
+        offset, entries = 0, []
+    if size > offset:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+        # Una línea sin salto final todavía se está escribiendo
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        entries = list(entries)
+        for line in complete.splitlines():
+            if line.strip():
+                entries.append(json.loads(line))
+        offset += len(complete)
+        _entries_cache[path] = (offset, entries)
+    return entries
+
+def load_entries(data_dir=None):
+    """Retorna las entradas del registro de cambios, de la más antigua a la más reciente"""
+    with _lock:
+        return _read_entries(_audit_path(data_dir))
+
+def entries_since(version, data_dir=None):
+    """Entradas con versión mayor a `version`"""
+    entries = load_entries(data_dir)
+    return [entry for entry in entries[max(version, 0):] if entry["version"] > version]
+
+def current_version(data_dir=None):
+    """Versión de la última entrada (0 si el registro está vacío)"""
+    entries = load_entries(data_dir)
+    return entries[-1]["version"] if entries else 0
+
+def append_entry(operation, change, data_dir=None, session=None):
+    """Agrega una operación al registro de cambios y retorna la entrada"""
+    path = _audit_path(data_dir)
+    with _lock:
+        entries = _read_entries(path)
+        entry = {
+            "version": entries[-1]["version"] + 1 if entries else 1,
+            "momento": get_now_ecuador().strftime('%Y-%m-%d %H:%M:%S'),
+            "operacion": operation,
+            "cambio": change,
+        }
+        if session is not None:
+            entry["sesion"] = session
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+    logger.info("audit_entry", extra={"version": entry["version"], "operacion": operation})
+    return entry
+
+def describe_entry(entry):
+    """Descripción corta de una entrada para la interfaz"""
+    change = entry["cambio"]
+    label = OPERATIONS.get(entry["operacion"], entry["operacion"])
+    if entry["operacion"] == "editar_estudiante":
+        detail = f"{change['antes']['nombre']} → {change['despues']['nombre']}"
+    elif "estudiante" in change:
+        detail = change["estudiante"]["nombre"]
+    elif entry["operacion"] == "mantenimiento":
+        detail = f"{change['comando']} ({len(change['eliminados'])} registro(s) quitados, " \
+                 f"{len(change['agregados'])} agregados)"
+    elif "registro" in change:
+        registro = change["registro"]
+        detail = f"{registro['tipo_limpieza']} {registro['fecha']} ({', '.join(registro['estudiantes'])})"
+    else:
+        detail = f"versión {change['version']}"
+    return f"#{entry['version']} {entry['momento']} · {label}: {detail}"
+
+def last_undoable(data_dir=None, session=None):
+    """Retorna la operación más reciente que aún no se ha deshecho.
+
+    Con `session` solo se consideran las operaciones hechas por esa sesión.
+    """
+    undone = set()
+    for entry in reversed(load_entries(data_dir)):
+        if entry["operacion"] == "mantenimiento":
+            # Un mantenimiento reescribe los datos: lo anterior ya no se puede deshacer
+            return None
+        if entry["operacion"] == "deshacer":
+            undone.add(entry["cambio"]["version"])
+        elif entry["version"] not in undone and (session is None or entry.get("sesion") == session):
+            return entry
+    return None
+
+# CAMBIOS EN LOS REGISTROS DE LIMPIEZA
+def _record_key(record):
+    return [record.get('fecha'), record.get('hora'), record.get('tipo_limpieza')]
+
+def student_record_changes(records, student_name, deletion=False):
+    """Registros en los que aparece el estudiante, como cambios para el registro de auditoría"""
+    changes = []
+    for pos, record in enumerate(records):
+        students = record_students(record)
+        if student_name not in students:
+            continue
+        if deletion and all(s == student_name for s in students):
+            # La eliminación descarta el registro: se guarda completo
+            changes.append({"pos": pos, "registro": dict(record)})
+        else:
+            changes.append({"pos": pos, "clave": _record_key(record), "estudiantes": list(students)})
+    return changes
+
+def archived_student_changes(student_name, deletion=False, data_dir=None):
+    """Cambios por partición del archivo para una operación sobre el estudiante"""
+    return {
+        key: student_record_changes(records, student_name, deletion)
+        for key, records in archived_partitions_with(student_name, data_dir).items()
+    }
+
+def _locate(records, pos, key, students):
+    """Posición del registro con esa clave y estudiantes; primero prueba la posición guardada"""
+    if pos < len(records):
+        record = records[pos]
+        if _record_key(record) == key and list(record_students(record)) == students:
+            return pos
+    for i, record in enumerate(records):
+        if _record_key(record) == key and list(record_students(record)) == students:
+            return i
+    logger.warning("audit_record_not_found", extra={"clave": key, "estudiantes": students})
+    return None
+
+# Las funciones _apply_* retornan la cantidad de cambios cuyo registro no se encontró
+
+def _set_students(records, pos, students):
+    # Se reemplaza el registro (no se modifica) para que una copia de la lista no afecte a la original
+    record = records[pos]
+    record = CleaningRecord(record.to_dict()) if type(record) is CleaningRecord else dict(record)
+    record['estudiantes'] = students
+    records[pos] = record
+
+def _apply_edit(records, changes, old_name, new_name, reverse):
+    missing = 0
+    for change in changes:
+        original = change["estudiantes"]
+        renamed = [new_name if s == old_name else s for s in original]
+        pos = _locate(records, change["pos"], change["clave"], renamed if reverse else original)
+        if pos is None:
+            missing += 1
+        else:
+            _set_students(records, pos, original if reverse else renamed)
+    return missing
+
+def _apply_deletion(records, changes, student_name, reverse):
+    missing = 0
+    if reverse:
+        # En orden ascendente: al reinsertar, las posiciones anteriores ya coinciden
+        for change in changes:
+            if "registro" in change:
+                records.insert(min(change["pos"], len(records)), compact_record(dict(change["registro"])))
+                continue
+            original = change["estudiantes"]
+            remaining = [s for s in original if s != student_name]
+            pos = _locate(records, change["pos"], change["clave"], remaining)
+            if pos is None:
+                missing += 1
+            else:
+                _set_students(records, pos, original)
+    else:
+        # En orden descendente para no desplazar las posiciones pendientes
+        for change in reversed(changes):
+            if "registro" in change:
+                registro = change["registro"]
+                pos = _locate(records, change["pos"], _record_key(registro), registro["estudiantes"])
+                if pos is None:
+                    missing += 1
+                else:
+                    del records[pos]
+                continue
+            original = change["estudiantes"]
+            pos = _locate(records, change["pos"], change["clave"], original)
+            if pos is None:
+                missing += 1
+            else:
+                _set_students(records, pos, [s for s in original if s != student_name])
+    return missing
+
+def _apply_registration(records, change, reverse):
+    registro = change["registro"]
+    if not reverse:
+        records.insert(min(change["pos"], len(records)), compact_record(dict(registro)))
+        return 0
+    pos = _locate(records, change["pos"], _record_key(registro), registro["estudiantes"])
+    if pos is None:
+        return 1
+    del records[pos]
+    return 0
+
+def _record_transform(entry, reverse):
+    """Retorna transform(registros, cambios) -> faltantes para los registros afectados por la entrada"""
+    change = entry["cambio"]
+    if entry["operacion"] == "editar_estudiante":
+        old_name, new_name = change["antes"]["nombre"], change["despues"]["nombre"]
+        return lambda records, changes: _apply_edit(records, changes, old_name, new_name, reverse)
+    if entry["operacion"] == "eliminar_estudiante":
+        name = change["estudiante"]["nombre"]
+        return lambda records, changes: _apply_deletion(records, changes, name, reverse)
+    return None
+
+# MANTENIMIENTO
+def _record_text(record):
+    return json.dumps(dict(record), ensure_ascii=False, sort_keys=True)
+
+def maintenance_changes(command, students_before, students_after, history_before, history_after):
+    """Cambio de un comando de mantenimiento: estudiantes antes/después y registros quitados o agregados"""
+    remaining = {}
+    for record in history_after:
+        remaining.setdefault(_record_text(record), []).append(record)
+    removed = []
+    for pos, record in enumerate(history_before):
+        same = remaining.get(_record_text(record))
+        if same:
+            same.pop()
+        else:
+            removed.append({"pos": pos, "registro": dict(record)})
+    before = {}
+    for record in history_before:
+        text = _record_text(record)
+        before[text] = before.get(text, 0) + 1
+    added = []
+    for pos, record in enumerate(history_after):
+        text = _record_text(record)
+        if before.get(text):
+            before[text] -= 1
+        else:
+            added.append({"pos": pos, "registro": dict(record)})
+    change = {"comando": command, "eliminados": removed, "agregados": added}
+    if students_before != students_after:
+        change["estudiantes"] = {"antes": students_before, "despues": students_after}
+    return change
+
+def _apply_maintenance(change, students, history, reverse):
+    removed, added = (change["agregados"], change["eliminados"]) if reverse else \
+        (change["eliminados"], change["agregados"])
+    missing = 0
+    for item in reversed(removed):
+        registro = item["registro"]
+        pos = _locate(history, item["pos"], _record_key(registro), list(registro.get("estudiantes") or []))
+        if pos is None:
+            missing += 1
+        else:
+            del history[pos]
+    for item in added:
+        history.insert(min(item["pos"], len(history)), compact_record(dict(item["registro"])))
+    if "estudiantes" in change:
+        students[:] = [dict(s) for s in change["estudiantes"]["antes" if reverse else "despues"]]
+    return missing
+
+# CAMBIOS EN LA LISTA DE ESTUDIANTES
+def _locate_student(students, pos, name):
+    if pos < len(students) and students[pos].get('nombre') == name:
+        return pos
+    return next((i for i, s in enumerate(students) if s.get('nombre') == name), None)
+
+def _apply_students(entry, students, reverse):
+    operation, change = entry["operacion"], entry["cambio"]
+    pos = change.get("pos", len(students))
+    adding = (operation == "agregar_estudiante") != reverse
+    if operation in ("agregar_estudiante", "eliminar_estudiante"):
+        student = change["estudiante"]
+        if adding:
+            students.insert(min(pos, len(students)), dict(student))
+            return 0
+        found = _locate_student(students, pos, student['nombre'])
+        if found is None:
+            logger.warning("audit_student_not_found", extra={"estudiante": student['nombre']})
+            return 1
+        del students[found]
+    elif operation == "editar_estudiante":
+        current, target = (change["despues"], change["antes"]) if reverse else (change["antes"], change["despues"])
+        found = _locate_student(students, pos, current['nombre'])
+        if found is None:
+            logger.warning("audit_student_not_found", extra={"estudiante": current['nombre']})
+            return 1
+        students[found] = dict(target)
+    return 0
+
+def apply_entry(entry, students, history, reverse=False, include_archive=False):
+    """Aplica una entrada (o su inverso) sobre las listas de estudiantes e historial, en el lugar.
+
+    Con `include_archive` los cambios del archivo también se aplican sobre
+    `history` (que debe contener los registros archivados). Retorna True si
+    se encontraron todos los estudiantes y registros que la entrada cambia.
+    """
+    if entry["operacion"] == "registrar_limpieza":
+        return _apply_registration(history, entry["cambio"], reverse) == 0
+    if entry["operacion"] == "mantenimiento":
+        return _apply_maintenance(entry["cambio"], students, history, reverse) == 0
+    missing = _apply_students(entry, students, reverse)
+    transform = _record_transform(entry, reverse)
+    if transform is not None:
+        missing += transform(history, entry["cambio"].get("registros", []))
+        if include_archive:
+            for changes in entry["cambio"].get("archivo", {}).values():
+                missing += transform(history, changes)
+    return missing == 0
+
+def _archive_applies(entry, reverse, data_dir=None):
+    """True si todos los registros que la entrada cambia en el archivo están en sus particiones"""
+    transform = _record_transform(entry, reverse)
+    return all(
+        transform([dict(r) for r in load_partition(key, data_dir)], changes) == 0
+        for key, changes in (entry["cambio"].get("archivo") or {}).items()
+    )
+
+def apply_archive_changes(entry, reverse=False, keys=None, written=None, data_dir=None):
+    """Aplica sobre las particiones del archivo los cambios de la entrada (o su inverso).
+
+    `keys` limita las particiones a reescribir; las que se guardaron se
+    agregan a `written`. Retorna False si alguna partición no se guardó.
+    """
+    archive_changes = entry["cambio"].get("archivo") or {}
+    transform = _record_transform(entry, reverse)
+    ok = True
+    for key, changes in sorted(archive_changes.items()):
+        if keys is not None and key not in keys:
+            continue
+        rewrite = lambda records, changes=changes: (transform(records, changes), records)[1]
+        if rewrite_partitions({key: rewrite}, data_dir):
+            if written is not None:
+                written.append(key)
+        else:
+            ok = False
+    return ok
+
+def save_with_archive(entry, students, history, save, reverse=False, data_dir=None):
+    """Guarda una operación ya aplicada sobre las listas y después sus cambios del archivo.
+
+    `save()` guarda el historial activo. Si una partición del archivo no se
+    puede guardar, se revierte lo ya guardado (listas, historial activo y
+    particiones reescritas) para que los datos sigan coincidiendo con el
+    registro de cambios, y se retorna False.
+    """
+    if not save():
+        return False
+    written = []
+    if apply_archive_changes(entry, reverse, written=written, data_dir=data_dir):
+        return True
+    logger.error("archive_update_failed", extra={"operacion": entry["operacion"], "particiones": written})
+    apply_entry(entry, students, history, reverse=not reverse)
+    save()
+    apply_archive_changes(entry, not reverse, keys=written, data_dir=data_dir)
+    return False
+
+# DESHACER Y RECONSTRUIR
+def undo_last(students, history, data_dir=None, session=None, save=None):
+    """Deshace la última operación (de la sesión, si se indica) sobre las listas dadas y guarda los datos.
+
+    `save()` guarda las listas (por defecto, ambos archivos con `save_clean_data`).
+    Si otra operación cambió o quitó algo que la entrada toca, no se deshace
+    nada (las listas quedan igual) y se retorna ok=False.
+    Retorna (entrada deshecha, ok); la entrada es None si no hay nada que deshacer.
+    """
+    entry = last_undoable(data_dir, session)
+    if entry is None:
+        return None, True
+    # Se aplica sobre copias: si algo no coincide, las listas de la sesión no cambian
+    new_students, new_history = [dict(s) for s in students], list(history)
+    if not (apply_entry(entry, new_students, new_history, reverse=True)
+            and _archive_applies(entry, reverse=True, data_dir=data_dir)):
+        logger.warning("undo_conflict", extra={"version": entry["version"]})
+        return entry, False
+    students[:] = new_students
+    history[:] = new_history
+    if save is None:
+        save = lambda: save_clean_data(students, history, data_dir=data_dir)
+    ok = save_with_archive(entry, students, history, save, reverse=True, data_dir=data_dir)
+
+    if ok:
+        append_entry("deshacer", {"version": entry["version"]}, data_dir, session)
+    else:
+        logger.error("undo_failed", extra={"version": entry["version"]})
+    return entry, ok
+
+def reconstruct(version=None, moment=None, data_dir=None):
+    """Retorna (estudiantes, historial completo) tal como estaban en una versión o momento.
+
+    `moment` es un texto 'YYYY-MM-DD HH:MM:SS'; se conservan las operaciones
+    hasta ese instante. El historial incluye los registros archivados.
+    """
+    students = [dict(s) for s in load_data(STUDENTS_FILE, data_dir)]
+    history = compact_history([dict(r) for r in load_archived(date.min, date.max, data_dir)])
+    history.extend(compact_history(load_data(HISTORY_FILE, data_dir)))
+
+    entries = load_entries(data_dir)
+    by_version = {entry["version"]: entry for entry in entries}
+    for entry in reversed(entries):
+        if version is not None and entry["version"] <= version:
+            break
+        if moment is not None and entry["momento"] <= moment:
+            break
+        if entry["operacion"] == "deshacer":
+            # Retroceder un deshacer es volver a aplicar la operación deshecha
+            target = by_version.get(entry["cambio"]["version"])
+            if target is not None:
+                apply_entry(target, students, history, include_archive=True)
+        else:
+            apply_entry(entry, students, history, reverse=True, include_archive=True)
+    return students, history
+
@@ -0,0 +1,191 @@
+"""Guardado atómico de los archivos JSON de datos.
+
+Un guardado puede incluir varios archivos (por ejemplo estudiantes e
+historial) que deben quedar actualizados juntos o ninguno:
+
+1. escribe cada archivo en `<archivo>.tmp` y hace fsync,
+2. si hay más de un archivo, escribe el diario `.commit.json` con la lista
+   y hace fsync,
+3. renombra los temporales sobre los archivos finales,
+4. hace fsync del directorio y borra el diario.
+
+Si el proceso se interrumpe después del paso 2, `recover` completa los
+renombres pendientes; si se interrumpe antes, los archivos finales quedan
+intactos y los temporales se sobrescriben en el siguiente guardado.
+
+Cada guardado es una copia completa de sus archivos y los guardados de un
+directorio se hacen uno a la vez, en el hilo del llamador: `writer_lock`
+toma un candado por directorio en el proceso y, con `fcntl`, un candado del
+sistema sobre `.commit.lock` que comparten la aplicación y `cli.py`.
+`recover` y `clean_temp_files` también lo toman, así nunca tocan los
+temporales ni el diario de un guardado en curso. Un guardado puede
+indicar la firma (`file_signature`) que espera encontrar en disco para cada
+archivo; si otro guardado la cambió antes, se rechaza (resultado False) sin
+escribir nada, y el llamador debe recargar los datos y volver a intentar.
+"""
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from utils.logging_config import get_logger
+from utils.metrics import inc, observe, timed
+
+try:
+    import fcntl
+except ImportError:
+    # Sin fcntl (Windows) el candado solo ordena los guardados de este proceso
+    fcntl = None
+
+logger = get_logger("commit")
+
+JOURNAL_FILE = ".commit.json"
+LOCK_FILE = ".commit.lock"
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def file_signature(path):
+    """Firma (inodo, mtime en ns, tamaño) del archivo, o None si no existe.
+
+    Cada guardado reemplaza el archivo por uno nuevo, así que el inodo cambia
+    aunque la hora de modificación no alcance a distinguir dos escrituras.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _dir_lock(data_dir):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(data_dir), threading.Lock())
+
+@contextmanager
+def writer_lock(data_dir):
+    """Candado de escritura del directorio, entre hilos y entre procesos"""
+    with _dir_lock(data_dir):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(data_dir, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def recover(data_dir):
+    """Completa o descarta un guardado interrumpido en `data_dir`"""
+    if not os.path.isdir(data_dir):
+        return
+    with writer_lock(data_dir):
+        _recover(data_dir)
+
+def clean_temp_files(data_dir):
+    """Recupera un guardado interrumpido y borra los temporales abandonados; retorna sus rutas"""
+    with writer_lock(data_dir):
+        _recover(data_dir)
+        # Con el candado tomado ningún guardado está en curso: todo temporal quedó de una interrupción
+        paths = glob.glob(os.path.join(data_dir, "**", "*.tmp"), recursive=True)
+        for path in paths:
+            os.remove(path)
+    return paths
+
+def _recover(data_dir):
+    journal_path = os.path.join(data_dir, JOURNAL_FILE)
+    if os.path.exists(journal_path):
+        try:
+            with open(journal_path, "r", encoding="utf-8") as f:
+                filenames = json.load(f)["archivos"]
+        except (OSError, ValueError, KeyError):
+            filenames = None
+        if filenames is not None:
+            for filename in filenames:
+                filepath = os.path.join(data_dir, filename)
+                if os.path.exists(filepath + ".tmp"):
+                    os.replace(filepath + ".tmp", filepath)
+            _fsync_dir(data_dir)
+            logger.warning("commit_recovered", extra={"archivos": filenames})
+        os.remove(journal_path)
+
+def _conflicts(data_dir, expected):
+    return sorted(
+        filename for filename, signature in (expected or {}).items()
+        if file_signature(os.path.join(data_dir, filename)) != signature
+    )
+
+def commit(data_dir, files, expected=None):
+    """Escribe {archivo: bytes} de forma atómica en conjunto; retorna True/False.
+
+    `expected` ({archivo: firma}) rechaza el guardado si algún archivo
+    cambió en disco desde que el llamador lo leyó.
+    """
+    with writer_lock(data_dir):
+        conflicts = _conflicts(data_dir, expected)
+        if conflicts:
+            inc("limpieza_commit_conflicts_total", archivo=",".join(conflicts))
+            logger.warning("commit_conflict", extra={"archivos": conflicts})
+            return False
+        try:
+            with timed("limpieza_commit_seconds"):
+                _write(data_dir, files)
+        except Exception as e:
+            inc("limpieza_errors_total", operacion="commit", archivo=",".join(sorted(files)))
+            logger.error("commit_failed", extra={"archivos": sorted(files), "error": str(e)})
+            for filename in files:
+                try:
+                    os.remove(os.path.join(data_dir, filename) + ".tmp")
+                except OSError:
+                    pass
+            return False
+        return True
+
+def _write(data_dir, files):
+    for filename, payload in files.items():
+        temp_path = os.path.join(data_dir, filename) + ".tmp"
+        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            if os.fstat(f.fileno()).st_size != len(payload):
+                raise IOError(f"Verificación de tamaño fallida para {filename}")
+        inc("limpieza_fsync_total")
+        observe("limpieza_save_bytes", len(payload), archivo=filename)
+        inc("limpieza_save_bytes_total", len(payload), archivo=filename)
+
+    directories = {os.path.dirname(os.path.join(data_dir, f)) for f in files}
+    journal_path = os.path.join(data_dir, JOURNAL_FILE)
+    if len(files) > 1:
+        with open(journal_path, "w", encoding="utf-8") as f:
+            json.dump({"archivos": sorted(files)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # Los temporales y el diario deben ser visibles antes de renombrar
+        for directory in directories | {data_dir}:
+            _fsync_dir(directory)
+        inc("limpieza_fsync_total")
+
+    for filename in files:
+        filepath = os.path.join(data_dir, filename)
+        os.replace(filepath + ".tmp", filepath)
+    for directory in directories:
+        _fsync_dir(directory)
+        inc("limpieza_fsync_total")
+
+    if len(files) > 1:
+        os.remove(journal_path)
@@ -0,0 +1,71 @@
+"""Exportación del historial filtrado a CSV o XLSX.
+
+Las filas se generan registro por registro y se escriben en bloques
+directamente al archivo de salida, sin construir un DataFrame ni una copia
+de todas las filas. Los registros de entrada (el historial filtrado) ya están
+en memoria, y la descarga de Streamlit envía el archivo completo desde memoria.
+"""
+import csv
+import io
+from itertools import islice
+
+from utils.metrics import timed_function
+
+try:
+    from openpyxl import Workbook
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+EXPORT_HEADERS = ['Fecha', 'Día', 'Hora', 'Estudiantes', 'Área']
+CHUNK_SIZE = 5000
+
+def iter_export_rows(records):
+    """Genera una fila por registro con las columnas de EXPORT_HEADERS"""
+    for record in records:
+        yield (
+            record['fecha'],
+            record['dia_semana'],
+            record['hora'],
+            ', '.join(record['estudiantes']),
+            record['tipo_limpieza'],
+        )
+
+@timed_function("limpieza_export_seconds", formato="csv")
+def write_csv(fileobj, records, chunk_size=CHUNK_SIZE):
+    """Escribe los registros como CSV (UTF-8 con BOM para Excel) en un archivo binario; retorna las filas"""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_HEADERS)
+    rows = iter_export_rows(records)
+    total = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        writer.writerows(chunk)
+        text.flush()
+        total += len(chunk)
+    # Dejar el archivo binario abierto para quien llama
+    text.detach()
+    return total
+
+@timed_function("limpieza_export_seconds", formato="xlsx")
+def write_xlsx(fileobj, records):
+    """Escribe los registros como XLSX en modo de solo escritura; retorna las filas"""
+    if not XLSX_AVAILABLE:
+        raise ImportError("openpyxl no está disponible")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Historial")
+    sheet.append(EXPORT_HEADERS)
+    total = 0
+    for row in iter_export_rows(records):
+        sheet.append(row)
+        total += 1
+    workbook.save(fileobj)
+    return total
+
+EXPORT_FORMATS = {
+    "CSV": (write_csv, "csv", "text/csv"),
+    "XLSX": (write_xlsx, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
@@ -0,0 +1,141 @@
+"""Detección de cambios en el directorio de datos.
+
+Un observador de `watchdog` por directorio mantiene la firma (mtime, tamaño)
+de cada archivo de datos y avisa a los oyentes registrados cuando alguno
+cambia, incluso si lo escribió otro proceso. Cada sesión guarda las firmas
+de los datos que cargó y, con `changed_since`, recarga solo los archivos
+que cambiaron. Sin `watchdog` las firmas se leen del disco en cada consulta
+y no hay avisos.
+
+Los avisos se agrupan durante `NOTIFY_DELAY_MS` para que un guardado (varios
+archivos y la entrada del registro de cambios) produzca un solo aviso.
+"""
+import os
+import threading
+
+from utils.audit import AUDIT_FILE
+from utils.logging_config import get_logger
+from utils.metrics import inc
+from utils.records import compact_record
+from utils.storage import HISTORY_FILE, STUDENTS_FILE, get_data_dir
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+logger = get_logger("live")
+
+WATCHED_FILES = (STUDENTS_FILE, HISTORY_FILE, AUDIT_FILE)
+NOTIFY_DELAY_MS = float(os.environ.get("LIMPIEZA_WATCH_DELAY_MS", "100"))
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Los eventos de apertura y cierre sin escritura (cada lectura) no cambian nada
+_WRITE_EVENTS = {"created", "modified", "moved", "deleted"}
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        # Los guardados renombran `<archivo>.tmp` sobre el archivo final
+        path = getattr(event, "dest_path", None) or event.src_path
+        if not event.is_directory and event.event_type in _WRITE_EVENTS:
+            self.watcher.file_changed(path)
+
+class DataWatcher:
+    """Firmas de los archivos de datos de un directorio, actualizadas por eventos del sistema de archivos"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._pending = set()
+        self._timer = None
+        self._signatures = {name: _signature(os.path.join(data_dir, name)) for name in WATCHED_FILES}
+        self._observer = None
+        if WATCHDOG_AVAILABLE:
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.schedule(_Handler(self), data_dir, recursive=True)
+            self._observer.start()
+
+    def versions(self):
+        """Retorna {archivo: firma} de los archivos de datos"""
+        if self._observer is None:
+            return {name: _signature(os.path.join(self.data_dir, name)) for name in WATCHED_FILES}
+        with self._lock:
+            return dict(self._signatures)
+
+    def changed_since(self, versions):
+        """Archivos cuya firma es distinta de la indicada"""
+        current = self.versions()
+        return {name for name, signature in current.items() if (versions or {}).get(name) != signature}
+
+    def add_listener(self, listener):
+        """Registra `listener(archivos_cambiados)`; se llama desde el hilo del observador"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def file_changed(self, path):
+        # Las particiones del archivo no se vigilan: su caché ya compara (mtime, tamaño)
+        relative = os.path.relpath(path, self.data_dir)
+        if relative not in self._signatures:
+            return
+        signature = _signature(path)
+        with self._lock:
+            if self._signatures[relative] == signature:
+                return
+            self._signatures[relative] = signature
+            self._pending.add(relative)
+            if self._timer is None:
+                self._timer = threading.Timer(NOTIFY_DELAY_MS / 1000, self._notify)
+                self._timer.daemon = True
+                self._timer.start()
+        inc("limpieza_data_changes_total", archivo=relative)
+
+    def _notify(self):
+        with self._lock:
+            changed, self._pending, self._timer = self._pending, set(), None
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(changed)
+            except Exception as e:
+                logger.error("listener_failed", extra={"archivos": sorted(changed), "error": str(e)})
+
+def apply_registrations(history, entries):
+    """Agrega al historial de la sesión los registros de las entradas `registrar_limpieza`.
+
+    Las entradas deben ser posteriores a la versión del registro de cambios
+    que la sesión ya tiene (leída con `data_lock` tomado). No se buscan
+    duplicados: dos limpiezas iguales en el mismo segundo son dos registros.
+    Retorna False, sin modificar nada, si alguna entrada es de otro tipo: en
+    ese caso hay que recargar el archivo.
+    """
+    if any(entry["operacion"] != "registrar_limpieza" for entry in entries):
+        return False
+    for entry in entries:
+        history.append(compact_record(dict(entry["cambio"]["registro"])))
+    return True
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+def get_watcher(data_dir=None):
+    """Retorna el observador del directorio (uno por proceso)"""
+    data_dir = os.path.abspath(data_dir or get_data_dir())
+    with _watchers_lock:
+        watcher = _watchers.get(data_dir)
+        if watcher is None:
+            watcher = _watchers[data_dir] = DataWatcher(data_dir)
+        return watcher
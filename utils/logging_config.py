@@ -0,0 +1,38 @@
+"""Logging estructurado (una línea JSON por evento) para reemplazar los print()."""
+import json
+import logging
+import os
+import sys
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_configured = False
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como JSON, incluyendo los campos pasados en `extra`"""
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "evento": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+def get_logger(name):
+    """Retorna un logger del sistema; configura la salida JSON la primera vez"""
+    global _configured
+    if not _configured:
+        root = logging.getLogger("limpieza")
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(os.environ.get("LIMPIEZA_LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+        _configured = True
+    return logging.getLogger(f"limpieza.{name}")
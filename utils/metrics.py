@@ -0,0 +1,210 @@
+"""Métricas de rendimiento en memoria con exportación estilo Prometheus.
+
+Las métricas viven en el proceso, así que las comparten todas las sesiones de
+Streamlit. Los resúmenes guardan las últimas observaciones en una ventana
+acotada para calcular percentiles sin crecer indefinidamente.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WINDOW_SIZE = 1024
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+def percentile(values, fraction):
+    """Percentil por el método del rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class Summary:
+    """Cantidad, suma y ventana de observaciones recientes de una métrica"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.window = deque(maxlen=WINDOW_SIZE)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.window.append(value)
+
+    def quantile(self, fraction):
+        return percentile(self.window, fraction)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        """Incrementa un contador"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Registra una observación en un resumen (latencias, bytes, ...)"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary()
+            summary.observe(value)
+
+    @contextmanager
+    def timed(self, name, **labels):
+        """Mide la duración del bloque en segundos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed_function(self, name, **labels):
+        """Decorador que mide la duración de cada llamada"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timed(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def counters(self):
+        """Retorna [(nombre, etiquetas, valor)] de todos los contadores"""
+        with self._lock:
+            return [(name, dict(labels), value) for (name, labels), value in sorted(self._counters.items())]
+
+    def summaries(self):
+        """Retorna [(nombre, etiquetas, cantidad, suma, p50, p95)] de todos los resúmenes"""
+        with self._lock:
+            return [
+                (name, dict(labels), s.count, s.total, s.quantile(0.5), s.quantile(0.95))
+                for (name, labels), s in sorted(self._summaries.items())
+            ]
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+    def render_prometheus(self):
+        """Retorna las métricas en el formato de texto de Prometheus"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted((key, s.count, s.total, s.quantile(0.5), s.quantile(0.95))
+                               for key, s in self._summaries.items())
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), count, total, p50, p95 in summaries:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+            lines.append(f"{name}{_format_labels(labels, [('quantile', '0.5')])} {p50}")
+            lines.append(f"{name}{_format_labels(labels, [('quantile', '0.95')])} {p95}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timed = REGISTRY.timed
+timed_function = REGISTRY.timed_function
+
+REGISTRY.describe("limpieza_load_seconds", "Duración de load_data por archivo")
+REGISTRY.describe("limpieza_save_seconds", "Duración de save_data por archivo")
+REGISTRY.describe("limpieza_save_bytes", "Bytes escritos por cada save_data")
+REGISTRY.describe("limpieza_save_bytes_total", "Bytes escritos en total por archivo")
+REGISTRY.describe("limpieza_query_seconds", "Duración de filtros y construcción de tablas")
+REGISTRY.describe("limpieza_pdf_seconds", "Duración de la generación de PDF")
+REGISTRY.describe("limpieza_export_seconds", "Duración de la exportación del historial a CSV/XLSX")
+REGISTRY.describe("limpieza_reruns_total", "Ejecuciones del script de Streamlit por página")
+REGISTRY.describe("limpieza_cache_requests_total", "Consultas a cachés por resultado (hit/miss)")
+REGISTRY.describe("limpieza_errors_total", "Errores de carga y guardado")
+REGISTRY.describe("limpieza_data_changes_total", "Cambios detectados en los archivos de datos")
+REGISTRY.describe("limpieza_commit_seconds", "Duración de cada guardado atómico (temporales, diario y renombre)")
+REGISTRY.describe("limpieza_commit_conflicts_total", "Guardados rechazados porque el archivo cambió desde que se leyó")
+
+def cache_hit_rates(registry=REGISTRY):
+    """Retorna {caché: (aciertos, fallos, tasa)} a partir de limpieza_cache_requests_total"""
+    rates = {}
+    for name, labels, value in registry.counters():
+        if name != "limpieza_cache_requests_total":
+            continue
+        hits, misses = rates.get(labels.get("cache"), (0, 0))
+        if labels.get("resultado") == "hit":
+            hits += value
+        else:
+            misses += value
+        rates[labels.get("cache")] = (hits, misses)
+    return {cache: (hits, misses, hits / (hits + misses) if hits + misses else 0.0)
+            for cache, (hits, misses) in rates.items()}
+
+# SERVIDOR OPCIONAL PARA PROMETHEUS
+_server = None
+_server_lock = threading.Lock()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Expone /metrics en un hilo de fondo (una sola vez por proceso)"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
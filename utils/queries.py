@@ -0,0 +1,63 @@
+import pandas as pd
+
+from utils.metrics import timed_function
+from utils.records import record_date, record_has_student
+from utils.storage import DIAS_SEMANA
+
+def parse_record_date(record):
+    """Convierte el campo `fecha` de un registro en un objeto date"""
+    return record_date(record)
+
+def get_week_records(cleaning_history, week_dates):
+    """Retorna los registros cuya fecha pertenece a la semana indicada"""
+    week_set = set(week_dates)
+    return [r for r in cleaning_history if parse_record_date(r) in week_set]
+
+@timed_function("limpieza_query_seconds", consulta="resumen_semanal")
+def build_week_summary(cleaning_history, week_dates):
+    """Construye las filas del resumen semanal del Dashboard"""
+    records_by_day = {day_date: [] for day_date in week_dates}
+    for record in cleaning_history:
+        day_records = records_by_day.get(parse_record_date(record))
+        if day_records is not None:
+            day_records.append(record)
+
+    week_summary = []
+    for day_date in week_dates:
+        day_name = DIAS_SEMANA[day_date.weekday()]
+        for record in records_by_day[day_date]:
+            week_summary.append({
+                'Día': day_name,
+                'Fecha': day_date.strftime('%d/%m/%Y'),
+                'Estudiantes': ', '.join(record['estudiantes']),
+                'Área': record['tipo_limpieza'],
+                'Hora': record['hora']
+            })
+    return week_summary
+
+@timed_function("limpieza_query_seconds", consulta="filtro_historial")
+def filter_history(cleaning_history, filter_type="Todos", start_date=None, end_date=None):
+    """Filtra el historial por tipo de limpieza y rango de fechas (inclusivo)"""
+    filtered_history = list(cleaning_history)
+    if filter_type != "Todos":
+        filtered_history = [r for r in filtered_history if r['tipo_limpieza'] == filter_type]
+    if start_date is not None and end_date is not None:
+        filtered_history = [
+            r for r in filtered_history
+            if start_date <= parse_record_date(r) <= end_date
+        ]
+    return filtered_history
+
+@timed_function("limpieza_query_seconds", consulta="dataframe_historial")
+def build_history_dataframe(filtered_history):
+    """Construye la tabla que se muestra en la página de Reportes"""
+    # Construir solo las columnas que se muestran (evita copiar cada registro completo)
+    columns = ['fecha', 'dia_semana', 'hora', 'estudiantes', 'tipo_limpieza']
+    history_df = pd.DataFrame({key: [r[key] for r in filtered_history] for key in columns})
+    history_df['Fecha'] = pd.to_datetime(history_df['fecha']).dt.strftime('%d/%m/%Y')
+    return history_df[['Fecha'] + columns[1:]]
+
+@timed_function("limpieza_query_seconds", consulta="conteo_estudiante")
+def count_student_records(cleaning_history, student_name):
+    """Cuenta en cuántos registros de limpieza aparece un estudiante"""
+    return sum(1 for record in cleaning_history if record_has_student(record, student_name))
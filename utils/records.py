@@ -0,0 +1,270 @@
+"""Modelo compacto en memoria de los registros de limpieza.
+
+Cada registro se guarda en un objeto con `__slots__` y campos numéricos:
+
+- fecha y fecha del timestamp como ordinal de `date` (int),
+- hora como segundos desde la medianoche (int),
+- área y día de la semana como códigos de enumeración,
+- estudiantes como tupla de referencias a un catálogo compartido de nombres
+  (cada nombre existe una sola vez en memoria).
+
+Los textos (`'2025-10-14'`, `'Martes'`, `'08:15:00'`, ...) se generan al leer
+la clave. `CleaningRecord` es un `MutableMapping`, así que el código de las
+páginas, pandas y `json` (vía `serialize_data`) lo usan como un diccionario.
+Los registros que no se pueden compactar (campos faltantes o con formato
+inesperado) se mantienen como diccionarios normales.
+"""
+import threading
+from collections.abc import MutableMapping
+from datetime import date, datetime
+
+from utils.storage import DIAS_SEMANA
+
+AREAS = ["Aula", "Baños"]
+_AREA_CODES = {name: code for code, name in enumerate(AREAS)}
+_DAY_CODES = {name: code for code, name in enumerate(DIAS_SEMANA)}
+
+# Claves en el mismo orden con el que la página de Limpieza crea los registros
+RECORD_KEYS = ('fecha', 'dia_semana', 'hora', 'estudiantes', 'tipo_limpieza', 'timestamp')
+_REQUIRED_KEYS = RECORD_KEYS[:5]
+
+class StudentPool:
+    """Catálogo de nombres de estudiantes; cada nombre se guarda una sola vez"""
+
+    def __init__(self):
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def intern(self, name):
+        """Retorna la instancia compartida del nombre"""
+        shared = self._names.get(name)
+        if shared is None:
+            if type(name) is not str:
+                raise ValueError(f"nombre de estudiante inválido: {name!r}")
+            with self._lock:
+                shared = self._names.setdefault(name, name)
+        return shared
+
+    def __len__(self):
+        return len(self._names)
+
+STUDENT_POOL = StudentPool()
+
+# Conversión texto <-> entero con memoria: las fechas y horas se repiten mucho
+_date_ordinals = {}
+_date_texts = {}
+_time_seconds = {}
+_time_texts = {}
+
+def _parse_date(text):
+    ordinal = _date_ordinals.get(text)
+    if ordinal is None:
+        if type(text) is not str:
+            raise ValueError(f"fecha inválida: {text!r}")
+        parsed = date.fromisoformat(text)
+        # Solo se aceptan textos que se reconstruyen exactamente (YYYY-MM-DD)
+        if parsed.isoformat() != text:
+            raise ValueError(f"fecha inválida: {text!r}")
+        ordinal = _date_ordinals.setdefault(text, parsed.toordinal())
+    return ordinal
+
+def _format_date(ordinal):
+    text = _date_texts.get(ordinal)
+    if text is None:
+        text = _date_texts.setdefault(ordinal, date.fromordinal(ordinal).isoformat())
+    return text
+
+def _parse_time(text):
+    seconds = _time_seconds.get(text)
+    if seconds is None:
+        if type(text) is not str or len(text) != 8 or text[2] != ':' or text[5] != ':' \
+           or not (text[0:2].isdigit() and text[3:5].isdigit() and text[6:8].isdigit()):
+            raise ValueError(f"hora inválida: {text!r}")
+        hours, minutes, secs = int(text[0:2]), int(text[3:5]), int(text[6:8])
+        if hours > 23 or minutes > 59 or secs > 59:
+            raise ValueError(f"hora inválida: {text!r}")
+        seconds = _time_seconds.setdefault(text, hours * 3600 + minutes * 60 + secs)
+    return seconds
+
+def _format_time(seconds):
+    text = _time_texts.get(seconds)
+    if text is None:
+        text = _time_texts.setdefault(
+            seconds, f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        )
+    return text
+
+def _encode_students(value):
+    if type(value) is not list and type(value) is not tuple:
+        raise ValueError("estudiantes debe ser una lista de nombres")
+    intern = STUDENT_POOL.intern
+    return tuple([intern(name) for name in value])
+
+class CleaningRecord(MutableMapping):
+    """Registro de limpieza compacto y compatible con dict"""
+
+    __slots__ = ('_fecha', '_dia', '_hora', '_est', '_tipo', '_ts', '_extra')
+
+    def __init__(self, data):
+        try:
+            self._fecha = _parse_date(data['fecha'])
+            self._dia = _DAY_CODES[data['dia_semana']]
+            self._hora = _parse_time(data['hora'])
+            self._est = _encode_students(data['estudiantes'])
+            self._tipo = _AREA_CODES[data['tipo_limpieza']]
+        except KeyError as e:
+            raise ValueError(f"campo faltante o inválido: {e}")
+        self._ts = None
+        self._extra = None
+        for key, value in data.items():
+            if key not in _REQUIRED_KEYS:
+                self[key] = value
+
+    # Acceso por clave
+    def __getitem__(self, key):
+        if key == 'fecha':
+            return _format_date(self._fecha)
+        if key == 'dia_semana':
+            return DIAS_SEMANA[self._dia]
+        if key == 'hora':
+            return _format_time(self._hora)
+        if key == 'estudiantes':
+            return list(self._est)
+        if key == 'tipo_limpieza':
+            return AREAS[self._tipo]
+        if key == 'timestamp':
+            ts = self._ts
+            if ts is None:
+                raise KeyError(key)
+            if type(ts) is int:
+                return f"{_format_date(ts)} {_format_time(self._hora)}"
+            return f"{_format_date(ts[0])} {_format_time(ts[1])}"
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'fecha':
+            self._fecha = _parse_date(value)
+        elif key == 'dia_semana':
+            if value not in _DAY_CODES:
+                raise ValueError(f"dia_semana inválido: {value!r}")
+            self._dia = _DAY_CODES[value]
+        elif key == 'hora':
+            seconds = _parse_time(value)
+            # El timestamp que comparte la hora anterior debe conservarla
+            if type(self._ts) is int and seconds != self._hora:
+                self._ts = (self._ts, self._hora)
+            self._hora = seconds
+        elif key == 'estudiantes':
+            self._est = _encode_students(value)
+        elif key == 'tipo_limpieza':
+            if value not in _AREA_CODES:
+                raise ValueError(f"tipo_limpieza inválido: {value!r}")
+            self._tipo = _AREA_CODES[value]
+        elif key == 'timestamp':
+            if type(value) is not str or len(value) != 19 or value[10] != ' ':
+                raise ValueError(f"timestamp inválido: {value!r}")
+            ts_date = _parse_date(value[:10])
+            ts_time = _parse_time(value[11:])
+            # Normalmente la hora del timestamp es la misma del registro
+            self._ts = ts_date if ts_time == self._hora else (ts_date, ts_time)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if self._extra is not None and key in self._extra:
+            del self._extra[key]
+        elif key == 'timestamp' and self._ts is not None:
+            self._ts = None
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield from _REQUIRED_KEYS
+        if self._ts is not None:
+            yield 'timestamp'
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return 5 + (self._ts is not None) + (len(self._extra) if self._extra else 0)
+
+    def __contains__(self, key):
+        if key in _REQUIRED_KEYS:
+            return True
+        if key == 'timestamp':
+            return self._ts is not None
+        return self._extra is not None and key in self._extra
+
+    # Accesos rápidos sin generar textos
+    @property
+    def date(self):
+        return date.fromordinal(self._fecha)
+
+    @property
+    def date_ordinal(self):
+        return self._fecha
+
+    @property
+    def area_code(self):
+        return self._tipo
+
+    @property
+    def students(self):
+        """Tupla (inmutable) de los nombres de los estudiantes"""
+        return self._est
+
+    def to_dict(self):
+        data = {
+            'fecha': _format_date(self._fecha),
+            'dia_semana': DIAS_SEMANA[self._dia],
+            'hora': _format_time(self._hora),
+            'estudiantes': list(self._est),
+            'tipo_limpieza': AREAS[self._tipo],
+        }
+        if self._ts is not None:
+            data['timestamp'] = self['timestamp']
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def copy(self):
+        return self.to_dict()
+
+    def __reduce__(self):
+        return (CleaningRecord, (self.to_dict(),))
+
+    def __repr__(self):
+        return f"CleaningRecord({self.to_dict()!r})"
+
+def compact_record(record):
+    """Retorna el registro compacto, o el diccionario original si no se puede compactar"""
+    if type(record) is CleaningRecord:
+        return record
+    try:
+        return CleaningRecord(record)
+    except (ValueError, TypeError, AttributeError):
+        return record
+
+def compact_history(records):
+    """Compacta una lista de registros de limpieza"""
+    return [compact_record(record) for record in records]
+
+def record_date(record):
+    """Fecha de un registro (compacto o diccionario) como objeto date"""
+    if type(record) is CleaningRecord:
+        return date.fromordinal(record._fecha)
+    return datetime.strptime(record['fecha'], '%Y-%m-%d').date()
+
+def record_students(record):
+    """Estudiantes de un registro sin copiar la lista cuando es compacto"""
+    if type(record) is CleaningRecord:
+        return record._est
+    return record['estudiantes']
+
+def record_has_student(record, student_name):
+    """Indica si el estudiante participa en el registro"""
+    return student_name in record_students(record)
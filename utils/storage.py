@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+import pytz
+
+from utils.commit import commit, file_signature, recover
+from utils.logging_config import get_logger
+from utils.metrics import inc, timed
+
+logger = get_logger("storage")
+
+# Configuración de zona horaria de Ecuador
+ECUADOR_TZ = pytz.timezone('America/Guayaquil')
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+STUDENTS_FILE = "students.json"
+HISTORY_FILE = "cleaning_history.json"
+
+_recovered_dirs = set()
+_data_locks = {}
+_data_locks_guard = threading.Lock()
+
+# FUNCIONES PARA OBTENER LA FECHA ACTUAL EN ECUADOR
+def get_today_ecuador():
+    """Retorna la fecha actual en zona horaria de Ecuador"""
+    return datetime.now(ECUADOR_TZ).date()
+
+def get_now_ecuador():
+    """Retorna datetime actual en zona horaria de Ecuador"""
+    return datetime.now(ECUADOR_TZ)
+
+def get_week_dates(day):
+    """Retorna las fechas de lunes a viernes de la semana que contiene `day`"""
+    start_of_week = day - timedelta(days=day.weekday())
+    return [start_of_week + timedelta(days=i) for i in range(5)]
+
+def get_current_week_dates():
+    """Obtiene las fechas de la semana actual en zona horaria de Ecuador"""
+    return get_week_dates(get_today_ecuador())
+
+# FUNCIONES PARA MANEJO DE DATOS
+def get_data_dir():
+    """Determina y crea el directorio de datos apropiado"""
+    # La variable LIMPIEZA_DATA_DIR permite apuntar a otro directorio (CLI, pruebas)
+    data_dir = os.environ.get("LIMPIEZA_DATA_DIR")
+    # Luego intenta usar el directorio /data si existe (para Hugging Face Spaces)
+    if not data_dir:
+        if os.path.exists("/data") and os.access("/data", os.W_OK):
+            data_dir = "/data"
+        else:
+            # Si no, usa el directorio local data/
+            project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            data_dir = os.path.join(project_dir, "data")
+
+    # Crear el directorio si no existe
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+def data_lock(data_dir=None):
+    """Candado (reentrante) del directorio de datos para leer, modificar y guardar sin intercalarse"""
+    data_dir = os.path.abspath(data_dir or get_data_dir())
+    with _data_locks_guard:
+        return _data_locks.setdefault(data_dir, threading.RLock())
+
+def data_signatures(data_dir=None):
+    """Retorna {archivo: firma} de los estudiantes y el historial activo"""
+    data_dir = data_dir or get_data_dir()
+    return {filename: file_signature(os.path.join(data_dir, filename)) for filename in (STUDENTS_FILE, HISTORY_FILE)}
+
+def load_data(filename, data_dir=None):
+    """Carga datos desde un archivo JSON"""
+    with timed("limpieza_load_seconds", archivo=filename):
+        return _load_data(filename, data_dir)
+
+def _load_data(filename, data_dir):
+    try:
+        data_dir = data_dir or get_data_dir()
+        filepath = os.path.join(data_dir, filename)
+        # Completar un guardado de varios archivos que haya quedado a medias
+        if data_dir not in _recovered_dirs:
+            recover(data_dir)
+            _recovered_dirs.add(data_dir)
+
+        # Si el archivo no existe, crear uno vacío
+        if not os.path.exists(filepath):
+            with open(filepath, "w", encoding="utf-8") as f:
+                json.dump([], f, ensure_ascii=False, indent=2)
+            return []
+
+        # Leer el archivo existente
+        with open(filepath, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+            if not content:
+                return []
+            data = json.loads(content)
+            return data if isinstance(data, list) else []
+    except Exception as e:
+        inc("limpieza_errors_total", operacion="load", archivo=filename)
+        logger.error("load_failed", extra={"archivo": filename, "error": str(e)})
+        return []
+
+def _json_default(value):
+    # Los registros compactos (utils.records) se guardan como diccionarios
+    if isinstance(value, Mapping):
+        return value.to_dict() if hasattr(value, "to_dict") else dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def serialize_data(data):
+    """Convierte los datos al JSON (UTF-8) que se guarda en disco"""
+    if isinstance(data, list):
+        # Convertir los registros compactos de una vez es más rápido que el hook `default`
+        data = [item.to_dict() if hasattr(item, "to_dict") else item for item in data]
+    return json.dumps(data, ensure_ascii=False, indent=2, default=_json_default).encode("utf-8")
+
+def save_data(data, filename, data_dir=None):
+    """Guarda datos en un archivo JSON"""
+    return save_many({filename: data}, data_dir)
+
+def save_many(files, data_dir=None, expected=None):
+    """Guarda varios archivos JSON ({archivo: datos}) de forma atómica en conjunto.
+
+    Los archivos se escriben con `commit` (temporales, diario y renombre);
+    retorna cuando están en disco.
+    Con `expected` ({archivo: firma de `file_signature`}) no se guarda nada y
+    se retorna False si algún archivo cambió desde que se leyó.
+    """
+    labels = ",".join(sorted(files))
+    with timed("limpieza_save_seconds", archivo=labels):
+        try:
+            data_dir = data_dir or get_data_dir()
+            payloads = {filename: serialize_data(data) for filename, data in files.items()}
+            ok = commit(data_dir, payloads, expected)
+        except Exception as e:
+            inc("limpieza_errors_total", operacion="save", archivo=labels)
+            logger.error("save_failed", extra={"archivo": labels, "error": str(e)})
+            return False
+        if ok:
+            logger.debug("saved", extra={"archivo": labels, "bytes": sum(len(p) for p in payloads.values())})
+        return ok
+
+# FUNCIÓN PARA ACTUALIZAR REGISTROS DE LIMPIEZA CUANDO SE ELIMINA UN ESTUDIANTE
+def update_cleaning_records_after_deletion(cleaning_history, student_name):
+    """Elimina al estudiante de todos los registros de limpieza donde aparece"""
+    updated_records = []
+    for record in cleaning_history:
+        students = record['estudiantes']
+        if student_name not in students:
+            updated_records.append(record)
+            continue
+
+        # Filtrar el estudiante eliminado de la lista de estudiantes
+        updated_students = [s for s in students if s != student_name]
+
+        # Solo mantener el registro si todavía tiene estudiantes
+        if updated_students:
+            record['estudiantes'] = updated_students
+            updated_records.append(record)
+
+    return updated_records
+
+# FUNCIÓN PARA ACTUALIZAR REGISTROS DE LIMPIEZA CUANDO SE EDITA UN ESTUDIANTE
+def update_cleaning_records_after_edit(cleaning_history, old_name, new_name):
+    """Actualiza el nombre del estudiante en todos los registros de limpieza"""
+    for record in cleaning_history:
+        students = record['estudiantes']
+        if old_name in students:
+            # Reemplazar el nombre antiguo por el nuevo
+            record['estudiantes'] = [new_name if s == old_name else s for s in students]
@@ -0,0 +1,190 @@
+"""Resúmenes de limpieza por estudiante en PDF, generados en lote.
+
+El historial se agrupa por estudiante en una sola pasada, cada PDF se genera
+en un proceso del pool y los resultados se escriben en un único ZIP a medida
+que terminan, sin guardar todos los PDF en memoria.
+
+Los procesos del pool se inician con `spawn`: un `fork` dentro del servidor
+de Streamlit copiaría los candados que otros hilos tienen tomados (por
+ejemplo el del registro de métricas). Por lo mismo, cada proceso retorna la
+duración de su PDF y `limpieza_pdf_seconds` se registra en el proceso
+principal. Un proceso `spawn` vuelve a ejecutar el `__main__` del padre, que
+en Streamlit es app.py completo; mientras se crean los procesos `__main__`
+se reemplaza por un módulo vacío.
+"""
+import io
+import multiprocessing
+import re
+import sys
+import time
+import types
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from utils.metrics import observe
+from utils.records import record_students
+from utils.storage import get_now_ecuador
+from utils.weekly_report import PDF_AVAILABLE
+
+if PDF_AVAILABLE:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+
+def group_by_student(records, students=None):
+    """Retorna {nombre: registros} recorriendo el historial una sola vez.
+
+    Si se indica la lista de estudiantes, todos aparecen (aunque no tengan
+    registros) y se ignoran los nombres que no están en ella.
+    """
+    grouped = {name: [] for name in students or ()}
+    for record in records:
+        for name in set(record_students(record)):
+            if students is None:
+                grouped.setdefault(name, []).append(record)
+            elif name in grouped:
+                grouped[name].append(record)
+    return grouped
+
+def student_pdf_filename(student_name):
+    """Nombre de archivo seguro para el resumen de un estudiante"""
+    safe_name = re.sub(r'[^\w]+', '_', student_name).strip('_') or 'estudiante'
+    return f"resumen_{safe_name}.pdf"
+
+def generate_student_pdf(student_name, records, start_date, end_date):
+    """Genera el resumen de un estudiante y retorna el PDF como bytes"""
+    if not PDF_AVAILABLE:
+        raise ImportError("reportlab no está disponible")
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    story = []
+    styles = getSampleStyleSheet()
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#1f77b4')
+    )
+    story.append(Paragraph("RESUMEN DE LIMPIEZA POR ESTUDIANTE", title_style))
+
+    info_style = ParagraphStyle('Info', parent=styles['Normal'], fontSize=12, spaceAfter=8, alignment=TA_CENTER)
+    story.append(Paragraph(f"<b>{escape(student_name)}</b>", info_style))
+    story.append(Paragraph(
+        f"Del {start_date.strftime('%d/%m/%Y')} al {end_date.strftime('%d/%m/%Y')}", info_style
+    ))
+    story.append(Spacer(1, 20))
+
+    records = sorted(records, key=lambda r: (r['fecha'], r['hora']))
+    if records:
+        table_data = [['Fecha', 'Día', 'Área', 'Hora', 'Compañeros']]
+        for record in records:
+            companions = ', '.join(s for s in record['estudiantes'] if s != student_name) or '-'
+            table_data.append([
+                datetime.strptime(record['fecha'], '%Y-%m-%d').strftime('%d/%m/%Y'),
+                record['dia_semana'],
+                record['tipo_limpieza'],
+                record['hora'],
+                Paragraph(escape(companions), styles['Normal']),
+            ])
+
+        table = Table(table_data, colWidths=[65, 60, 50, 50, 195], repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e86ab')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+        story.append(table)
+        story.append(Spacer(1, 25))
+
+        stats_style = ParagraphStyle('Stats', parent=styles['Normal'], fontSize=10, spaceAfter=6, leftIndent=20)
+        limpiezas_aula = sum(1 for r in records if r['tipo_limpieza'] == 'Aula')
+        stats_text = f"""
+        <b>ESTADÍSTICAS:</b><br/>
+        • Total de limpiezas: {len(records)}<br/>
+        • Limpiezas de aula: {limpiezas_aula}<br/>
+        • Limpiezas de baños: {len(records) - limpiezas_aula}<br/>
+        """
+        story.append(Paragraph(stats_text, stats_style))
+    else:
+        no_data_style = ParagraphStyle(
+            'NoData', parent=styles['Normal'], fontSize=12, textColor=colors.gray, alignment=TA_CENTER
+        )
+        story.append(Paragraph("No hay registros de limpieza en este período.", no_data_style))
+
+    story.append(Spacer(1, 30))
+    footer_style = ParagraphStyle(
+        'Footer', parent=styles['Normal'], fontSize=8, textColor=colors.gray, alignment=TA_CENTER
+    )
+    story.append(Paragraph(
+        f"Generado el {get_now_ecuador().strftime('%d/%m/%Y %H:%M:%S')} (Ecuador) - Sistema de Registro de Limpieza",
+        footer_style
+    ))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+def render_student_task(task):
+    """Genera un resumen; se ejecuta dentro de un proceso del pool y retorna también su duración"""
+    archive_name, student_name, records, start_date, end_date = task
+    start = time.perf_counter()
+    pdf_bytes = generate_student_pdf(student_name, records, start_date, end_date)
+    return archive_name, pdf_bytes, time.perf_counter() - start
+
+def build_student_tasks(grouped, start_date, end_date, prefix="", skip_empty=False):
+    """Prepara una tarea por estudiante (los registros viajan como diccionarios simples)"""
+    return [
+        (f"{prefix}{student_pdf_filename(name)}", name, [dict(r) for r in records], start_date, end_date)
+        for name, records in sorted(grouped.items())
+        if records or not skip_empty
+    ]
+
+@contextmanager
+def _empty_main():
+    """Reemplaza `__main__` por un módulo vacío para que los procesos nuevos no ejecuten la interfaz"""
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+def write_student_zip(fileobj, tasks, workers=None, progress=None):
+    """Genera los PDF en paralelo y los escribe en el ZIP a medida que terminan.
+
+    `progress(terminados, total, nombre)` se llama después de cada PDF.
+    Retorna la lista de (archivo, error) de los resúmenes que fallaron.
+    """
+    failures = []
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as archive, \
+         ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Los procesos del pool se crean al enviar las tareas
+        with _empty_main():
+            futures = {pool.submit(render_student_task, task): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            archive_name = futures[future][0]
+            try:
+                archive_name, pdf_bytes, seconds = future.result()
+                observe("limpieza_pdf_seconds", seconds, reporte="estudiante")
+                archive.writestr(archive_name, pdf_bytes)
+            except Exception as e:
+                failures.append((archive_name, str(e)))
+            if progress is not None:
+                progress(done, len(tasks), futures[future][1])
+    return failures
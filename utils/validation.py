@@ -0,0 +1,311 @@
+"""Validación y normalización de estudiantes e historial al cargar y al guardar.
+
+`load_data` acepta cualquier lista JSON; aquí se revisa todo una sola vez
+para que las páginas puedan asumir datos limpios:
+
+- historial: fecha YYYY-MM-DD (también se acepta DD/MM/YYYY), hora HH:MM:SS,
+  `tipo_limpieza` dentro de AREAS y al menos un estudiante. El día de la
+  semana y el timestamp se recalculan a partir de la fecha y la hora. Los
+  diccionarios se revisan por columnas con pandas; los registros compactos
+  ya tienen formato válido.
+- estudiantes: nombre no vacío y único, id único (los ids faltantes o
+  repetidos se reasignan).
+
+Los registros inválidos se mueven a `cuarentena.jsonl` con sus motivos y el
+archivo de datos se guarda sin ellos. Los registros que mencionan
+estudiantes no registrados (por ejemplo, por un cambio de otra sesión que
+aún no se ve) se conservan y solo se reportan como advertencia.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from collections.abc import Mapping
+
+import pandas as pd
+
+from utils.logging_config import get_logger
+from utils.metrics import REGISTRY, inc, timed_function
+from utils.records import AREAS, CleaningRecord, compact_record, record_students
+from utils.storage import DIAS_SEMANA, HISTORY_FILE, STUDENTS_FILE, get_data_dir, get_now_ecuador, load_data, save_many
+
+logger = get_logger("validation")
+
+QUARANTINE_FILE = "cuarentena.jsonl"
+
+_AREA_ALIASES = {'Banos': 'Baños', 'Baño': 'Baños', 'Bano': 'Baños'}
+_DATE_RE = r"\d{4}-\d{2}-\d{2}"
+_LOCAL_DATE_RE = r"\d{2}/\d{2}/\d{4}"
+_TIME_RE = r"(?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d"
+_INVALID = "\0"
+
+_lock = threading.Lock()
+
+REGISTRY.describe("limpieza_validation_total", "Registros normalizados, con advertencias o enviados a cuarentena")
+
+# ESTUDIANTES
+def next_student_id(students):
+    """Primer id STnnn (desde la cantidad de estudiantes + 1) que nadie usa"""
+    used = {s.get('id') for s in students}
+    number = len(students) + 1
+    while f"ST{number:03d}" in used:
+        number += 1
+    return f"ST{number:03d}"
+
+def validate_students(students):
+    """Retorna (estudiantes válidos, [(registro, motivos)], cantidad normalizada)"""
+    clean, rejected = [], []
+    names = set()
+    for student in students:
+        if not isinstance(student, Mapping):
+            rejected.append((student, ["no es un objeto"]))
+        elif type(student.get('nombre')) is not str or not student['nombre'].strip():
+            rejected.append((student, ["nombre inválido"]))
+        elif student['nombre'] in names:
+            rejected.append((student, ["nombre repetido"]))
+        else:
+            names.add(student['nombre'])
+            clean.append(student)
+
+    ids = set()
+    duplicated = []
+    for student in clean:
+        student_id = student.get('id')
+        if type(student_id) is not str or not student_id.strip() or student_id in ids:
+            duplicated.append(student)
+        else:
+            ids.add(student_id)
+    for student in duplicated:
+        student['id'] = next_student_id(clean)
+    return clean, rejected, len(duplicated)
+
+# HISTORIAL
+def _distinct_map(values, normalize):
+    """Aplica `normalize` (operaciones de pandas sobre una Serie) una sola vez por texto distinto.
+
+    Retorna {texto original: texto normalizado o None si es inválido}.
+    """
+    texts = pd.Series([v for v in pd.unique(pd.Series(values, dtype=object)) if type(v) is str], dtype=object)
+    result = normalize(texts.str.strip())
+    return dict(zip(texts, result.where(result.notna(), None)))
+
+def _normalize_dates(texts):
+    iso = pd.to_datetime(texts.where(texts.str.fullmatch(_DATE_RE)), format='%Y-%m-%d', errors='coerce')
+    local = pd.to_datetime(texts.where(texts.str.fullmatch(_LOCAL_DATE_RE)), format='%d/%m/%Y', errors='coerce')
+    return iso.fillna(local).dt.strftime('%Y-%m-%d')
+
+def _weekdays(texts):
+    return pd.to_datetime(texts, format='%Y-%m-%d').dt.dayofweek.map(dict(enumerate(DIAS_SEMANA)))
+
+def _normalize_times(texts):
+    return texts.where(texts.str.fullmatch(_TIME_RE))
+
+def _normalize_areas(texts):
+    areas = texts.str.capitalize().replace(_AREA_ALIASES)
+    return areas.where(areas.isin(AREAS))
+
+def _texts(values, missing=None):
+    """Columna como textos: None queda como `missing` y cualquier otro tipo como un texto inválido"""
+    return [v if type(v) is str else (missing if v is None else _INVALID) for v in values]
+
+def _check_dicts(records):
+    """Revisa por columnas una lista de diccionarios.
+
+    Las fechas, horas y áreas se repiten mucho: cada columna se valida con
+    pandas sobre sus valores distintos (el timestamp, por su fecha y su
+    hora) y el resultado se lleva a todas las filas con `Series.map`. Solo
+    las filas inválidas o que cambian se recorren una por una.
+
+    Retorna (registros listos para compactar, {posición: motivos}, posiciones normalizadas).
+    """
+    horas = [r.get('hora') for r in records]
+    raw_timestamps = [r.get('timestamp') for r in records]
+    frame = pd.DataFrame({
+        'fecha': _texts([r.get('fecha') for r in records]),
+        'dia_semana': [r.get('dia_semana') for r in records],
+        'hora': horas,
+        'hora_texto': _texts(horas, missing="00:00:00"),
+        'tipo_limpieza': _texts([r.get('tipo_limpieza') for r in records]),
+        'timestamp': raw_timestamps,
+    }, dtype=object)
+    # Si ninguna fila tiene un texto, `map` devuelve una Serie float de NaN
+    fecha = frame['fecha'].map(_distinct_map(frame['fecha'], _normalize_dates)).astype(object)
+    dia = fecha.map(_distinct_map(fecha.dropna(), _weekdays)).astype(object)
+    hora = frame['hora_texto'].map(_distinct_map(frame['hora_texto'], _normalize_times)).astype(object)
+    tipo = frame['tipo_limpieza'].map(_distinct_map(frame['tipo_limpieza'], _normalize_areas)).astype(object)
+    with_students = pd.Series([type(r.get('estudiantes')) is list and len(r['estudiantes']) > 0 for r in records])
+
+    # Solo se conservan los timestamps que ya están en el formato exacto
+    timestamps = [t if type(t) is str and len(t) == 19 and t[10] == " " else None for t in raw_timestamps]
+    ts_dates = {k for k, v in _distinct_map([t[:10] for t in timestamps if t], _normalize_dates).items() if k == v}
+    ts_times = {k for k, v in _distinct_map([t[11:] for t in timestamps if t], _normalize_times).items() if k == v}
+    valid_ts = pd.Series([t is not None and t[:10] in ts_dates and t[11:] in ts_times for t in timestamps])
+    timestamp = frame['timestamp'].where(valid_ts, fecha.str.cat(hora, sep=" "))
+
+    checks = (
+        (fecha.notna(), "fecha inválida"),
+        (hora.notna(), "hora inválida"),
+        (tipo.notna(), "tipo_limpieza desconocido"),
+        (with_students, "sin estudiantes"),
+    )
+    valid = fecha.notna() & hora.notna() & tipo.notna() & with_students
+    unchanged = valid & valid_ts & (fecha == frame['fecha']) & (dia == frame['dia_semana']) \
+        & (hora == frame['hora']) & (tipo == frame['tipo_limpieza'])
+
+    fixed = list(records)
+    reasons, normalized = {}, []
+    for i in (~unchanged).to_numpy().nonzero()[0].tolist():
+        if not valid.iat[i]:
+            reasons[i] = [label for mask, label in checks if not mask.iat[i]]
+            fixed[i] = None
+        else:
+            fixed[i] = dict(records[i], fecha=fecha.iat[i], dia_semana=dia.iat[i], hora=hora.iat[i],
+                            tipo_limpieza=tipo.iat[i], timestamp=timestamp.iat[i])
+            normalized.append(i)
+    return fixed, reasons, normalized
+
+@timed_function("limpieza_query_seconds", consulta="validacion_historial")
+def validate_history(records):
+    """Retorna (registros compactos válidos, [(registro, motivos)], cantidad normalizada)"""
+    clean = list(records)
+    rejected = {}
+
+    positions, objects = [], []
+    for i, record in enumerate(records):
+        if type(record) is CleaningRecord:
+            continue
+        if isinstance(record, Mapping):
+            positions.append(i)
+            objects.append(record)
+        else:
+            rejected[i] = (record, ["no es un objeto"])
+    fixed, reasons, normalized = _check_dicts(objects) if objects else ([], {}, [])
+    for j, i in enumerate(positions):
+        if j in reasons:
+            rejected[i] = (objects[j], reasons[j])
+            continue
+        compact = compact_record(fixed[j])
+        if type(compact) is not CleaningRecord:
+            rejected[i] = (objects[j], ["formato inválido"])
+        else:
+            clean[i] = compact
+
+    if rejected:
+        clean = [record for i, record in enumerate(clean) if i not in rejected]
+    return clean, [rejected[i] for i in sorted(rejected)], len(normalized)
+
+def unregistered_records(records, students):
+    """Registros que mencionan estudiantes que no están en la lista; se conservan, solo se reportan"""
+    known = {s['nombre'] for s in students}
+    # Basta con comparar primero el conjunto de nombres usados
+    referenced = set()
+    for record in records:
+        referenced.update(record_students(record))
+    unknown = referenced - known
+    if not unknown:
+        return []
+    return [record for record in records if not unknown.isdisjoint(record_students(record))]
+
+# CUARENTENA
+def quarantine(filename, rejected, data_dir=None):
+    """Agrega a cuarentena.jsonl los registros rechazados de un archivo"""
+    if not rejected:
+        return
+    path = os.path.join(data_dir or get_data_dir(), QUARANTINE_FILE)
+    moment = get_now_ecuador().strftime('%Y-%m-%d %H:%M:%S')
+    lines = []
+    for record, reasons in rejected:
+        if hasattr(record, "to_dict"):
+            record = record.to_dict()
+        entry = {"momento": moment, "archivo": filename, "motivos": reasons, "registro": record}
+        lines.append(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    inc("limpieza_validation_total", len(rejected), archivo=filename, resultado="cuarentena")
+    logger.warning("quarantined", extra={
+        "archivo": filename,
+        "registros": len(rejected),
+        "motivos": dict(Counter(reason for _, reasons in rejected for reason in reasons)),
+    })
+
+def load_quarantine(data_dir=None):
+    """Entradas de cuarentena.jsonl, de la más antigua a la más reciente"""
+    path = os.path.join(data_dir or get_data_dir(), QUARANTINE_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def quarantine_report(data_dir=None):
+    """Cantidad de registros en cuarentena por (archivo, motivo)"""
+    report = Counter()
+    for entry in load_quarantine(data_dir):
+        for reason in entry["motivos"]:
+            report[(entry["archivo"], reason)] += 1
+    return report
+
+# CARGA Y GUARDADO
+def _clean(students, history, data_dir, known_students=None):
+    """Valida y manda a cuarentena lo rechazado.
+
+    Retorna (estudiantes, historial, {archivo: datos} de los que cambiaron).
+    """
+    dirty = {}
+    if students is not None:
+        students, rejected, normalized = validate_students(students)
+        quarantine(STUDENTS_FILE, rejected, data_dir)
+        if normalized:
+            inc("limpieza_validation_total", normalized, archivo=STUDENTS_FILE, resultado="normalizado")
+        if rejected or normalized:
+            dirty[STUDENTS_FILE] = students
+    if history is not None:
+        history, rejected, normalized = validate_history(history)
+        quarantine(HISTORY_FILE, rejected, data_dir)
+        if normalized:
+            inc("limpieza_validation_total", normalized, archivo=HISTORY_FILE, resultado="normalizado")
+        if rejected or normalized:
+            dirty[HISTORY_FILE] = history
+        known = students if students is not None else known_students
+        unregistered = unregistered_records(history, known) if known else []
+        if unregistered:
+            inc("limpieza_validation_total", len(unregistered), archivo=HISTORY_FILE, resultado="advertencia")
+            logger.warning("unregistered_students", extra={"archivo": HISTORY_FILE, "registros": len(unregistered)})
+    return students, history, dirty
+
+def load_clean_data(data_dir=None, include_history=True):
+    """Carga los estudiantes y el historial (compacto) ya validados.
+
+    Si algo se rechazó o normalizó, los archivos se guardan limpios para que
+    la siguiente carga no repita el trabajo. Retorna (estudiantes, historial
+    o None).
+    """
+    data_dir = data_dir or get_data_dir()
+    with _lock:
+        students = load_data(STUDENTS_FILE, data_dir)
+        history = load_data(HISTORY_FILE, data_dir) if include_history else None
+        students, history, dirty = _clean(students, history, data_dir)
+        if dirty:
+            save_many(dirty, data_dir)
+    return students, history
+
+def save_clean_data(students=None, history=None, known_students=None, data_dir=None, expected=None):
+    """Valida y guarda los estudiantes y/o el historial indicados.
+
+    Si solo se guarda el historial, sus estudiantes se comparan con
+    `known_students` (los no registrados solo se reportan). Las
+    listas se corrigen en el lugar cuando algo se rechaza o normaliza, para
+    que la sesión vea lo mismo que el disco. `expected` se pasa a `save_many`.
+    Retorna True si se guardó.
+    """
+    data_dir = data_dir or get_data_dir()
+    clean_students, clean_history, dirty = _clean(students, history, data_dir, known_students)
+    if STUDENTS_FILE in dirty:
+        students[:] = clean_students
+    if HISTORY_FILE in dirty:
+        history[:] = clean_history
+    files = {filename: data for filename, data in ((STUDENTS_FILE, students), (HISTORY_FILE, history))
+             if data is not None}
+    return save_many(files, data_dir, expected)
@@ -0,0 +1,171 @@
+import os
+from datetime import datetime
+
+from utils.metrics import timed_function
+from utils.storage import get_today_ecuador, get_now_ecuador
+
+# Importar reportlab silenciosamente
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+REPORTS_DIR = "reportes"
+
+@timed_function("limpieza_pdf_seconds", reporte="semanal")
+def generate_pdf_report(records, week_dates, pdf_path=None):
+    """Genera el reporte semanal en PDF con reportlab y retorna la ruta del archivo"""
+    if not PDF_AVAILABLE:
+        raise ImportError("reportlab no está disponible")
+
+    if pdf_path is None:
+        # Nombre del archivo con fecha de Ecuador
+        today_ecuador = get_today_ecuador()
+        pdf_path = os.path.join(REPORTS_DIR, f"reporte_limpieza_semana_{today_ecuador.strftime('%Y-%m-%d')}.pdf")
+
+    # Crear directorio de reportes si no existe
+    os.makedirs(os.path.dirname(pdf_path) or ".", exist_ok=True)
+
+    # Crear el documento PDF
+    doc = SimpleDocTemplate(
+        pdf_path,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18
+    )
+
+    # Contenido del PDF
+    story = []
+    styles = getSampleStyleSheet()
+
+    # Título
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#1f77b4')
+    )
+    title = Paragraph("REPORTE SEMANAL DE LIMPIEZA", title_style)
+    story.append(title)
+
+    # Información de la semana
+    week_info_style = ParagraphStyle(
+        'WeekInfo',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceAfter=20,
+        alignment=TA_CENTER
+    )
+    week_info = Paragraph(
+        f"Semana del {week_dates[0].strftime('%d/%m/%Y')} al {week_dates[-1].strftime('%d/%m/%Y')}",
+        week_info_style
+    )
+    story.append(week_info)
+
+    story.append(Spacer(1, 20))
+
+    # Preparar datos para la tabla
+    if records:
+        # Encabezados de la tabla
+        table_data = [['Fecha', 'Día', 'Estudiantes', 'Área', 'Hora']]
+
+        for record in records:
+            # Limpiar caracteres problemáticos
+            estudiantes = ', '.join(record['estudiantes'])
+            # Reemplazar caracteres especiales
+            estudiantes = estudiantes.replace('•', '-').replace('–', '-').replace('—', '-')
+
+            fecha_obj = datetime.strptime(record['fecha'], '%Y-%m-%d')
+            fecha_formateada = fecha_obj.strftime('%d/%m/%Y')
+
+            table_data.append([
+                fecha_formateada,
+                record['dia_semana'],
+                estudiantes,
+                record['tipo_limpieza'],
+                record['hora']
+            ])
+
+        # Crear tabla
+        table = Table(table_data, colWidths=[70, 60, 180, 60, 50])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2e86ab')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+
+        story.append(table)
+
+        # Estadísticas
+        story.append(Spacer(1, 25))
+
+        stats_style = ParagraphStyle(
+            'Stats',
+            parent=styles['Normal'],
+            fontSize=10,
+            spaceAfter=6,
+            leftIndent=20
+        )
+
+        total_registros = len(records)
+        limpiezas_aula = len([r for r in records if r['tipo_limpieza'] == 'Aula'])
+        limpiezas_banos = len([r for r in records if r['tipo_limpieza'] == 'Baños'])
+
+        stats_text = f"""
+        <b>ESTADÍSTICAS:</b><br/>
+        • Total de registros: {total_registros}<br/>
+        • Limpiezas de aula: {limpiezas_aula}<br/>
+        • Limpiezas de baños: {limpiezas_banos}<br/>
+        """
+        stats = Paragraph(stats_text, stats_style)
+        story.append(stats)
+    else:
+        # Mensaje cuando no hay registros
+        no_data_style = ParagraphStyle(
+            'NoData',
+            parent=styles['Normal'],
+            fontSize=12,
+            textColor=colors.gray,
+            alignment=TA_CENTER
+        )
+        no_data = Paragraph("No hay registros de limpieza para esta semana.", no_data_style)
+        story.append(no_data)
+
+    # Pie de página con fecha de Ecuador
+    story.append(Spacer(1, 30))
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.gray,
+        alignment=TA_CENTER
+    )
+    now_ecuador = get_now_ecuador()
+    footer = Paragraph(
+        f"Generado el {now_ecuador.strftime('%d/%m/%Y %H:%M:%S')} (Ecuador) - Sistema de Registro de Limpieza",
+        footer_style
+    )
+    story.append(footer)
+
+    # Generar PDF
+    doc.build(story)
+    return pdf_path
+
+__all__ = ['generate_pdf_report', 'PDF_AVAILABLE']